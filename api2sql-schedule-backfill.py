@@ -0,0 +1,72 @@
+import json
+import os
+import pyodbc
+import requests
+from dotenv import load_dotenv
+from columnar import parse_seasons
+from connections import connect
+from datasets import schedule_spec
+import metrics
+import pipeline
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Seasons and season types to backfill, e.g. BACKFILL_SEASONS=2015-2024
+backfill_seasons = sorted(parse_seasons(os.getenv('BACKFILL_SEASONS', '2015-2024')))
+season_types = [int(t) for t in os.getenv('SCHEDULE_SEASON_TYPES', '1,2,3').split(',')]  # preseason, regular, postseason
+fetch_workers = int(os.getenv('SCHEDULE_WORKERS', 16))
+
+# Completed (season, season type) units are recorded here; a rerun resumes after the last one
+checkpoint_file = os.getenv('BACKFILL_CHECKPOINT', 'schedule_backfill_checkpoint.json')
+
+# Units already in the checkpoint are reloaded only if FORCE_LOAD=1
+force_load = os.getenv('FORCE_LOAD') == '1'
+
+
+def load_checkpoint():
+    try:
+        with open(checkpoint_file) as f:
+            return set(json.load(f).get('completed', []))
+    except FileNotFoundError:
+        return set()
+
+
+def save_checkpoint(completed):
+    # Write-then-rename so an interrupted run never leaves a truncated checkpoint
+    tmp_file = f'{checkpoint_file}.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({'completed': sorted(completed)}, f, indent=2)
+    os.replace(tmp_file, checkpoint_file)
+
+
+try:
+    # Connect to the database
+    conn = connect()
+    print("Connected to SQL Server")
+
+    completed = set() if force_load else load_checkpoint()
+    units = [(season, season_type) for season in backfill_seasons for season_type in season_types]
+    for season, season_type in units:
+        unit = f'{season}:{season_type}'
+        if unit in completed:
+            print(f"Skipping {unit}, already loaded")
+            continue
+
+        spec = schedule_spec('league', [season_type], fetch_workers, season=season)
+        pipeline.run(spec, conn, mode='bulk', force=force_load)
+        completed.add(unit)
+        save_checkpoint(completed)
+
+    print(f"Backfill complete: {len(units)} season/season type units")
+
+except requests.exceptions.RequestException as e:
+    print(f"Error fetching data from API: {e}; rerun to resume from {checkpoint_file}")
+except pyodbc.Error as e:
+    print(f"Error connecting to SQL Server: {e}")
+finally:
+    # Close the connection
+    if 'conn' in locals():
+        conn.close()
+    # Per-stage durations, rows and bytes for this run
+    metrics.print_summary()
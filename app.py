@@ -1,11 +1,25 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, request
 import pandas as pd
 import json
-from azure.storage.blob import BlobServiceClient
 from dotenv import load_dotenv
 from flask_cors import CORS
 import os
-import azure.core.exceptions
+import hashlib
+import inspect
+import io
+import time
+import metrics
+from blob_cache import BlobCache, ENCODINGS, compress, compress_stream, response_body
+from jobs import JobRunner
+from storage import get_storage, NotFoundError
+from dataset_index import get_index, has_query, parse_query, INDEXED_FIELDS
+from columnar import manifest_blob, parse_seasons, partition_blob, read_manifest, read_records, update_manifest, write_partitions
+from ingest import blob_name_for, decode_blob, open_csv_stream, read_blob_records, source_metadata, stream_csv_to_blob, DEFAULT_CHUNK_ROWS
+from metrics import timed
+from players import ID_TYPES, get_player_index
+from shared_cache import SharedCache
+from rollups import DraftRollups, ROLLUP_PREFIX, ROLLUPS, read_rollup, rollups_exist, write_rollups
+from snapshots import present as present_snapshot, reader as snapshot_reader, record_snapshot, snapshot_manifest_blob, snapshots_exist
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,140 +27,566 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-@app.route('/fetch-and-upload-draft-data', methods=['POST'])
-def fetch_and_upload_draft_data():
-    url = 'https://github.com/nflverse/nflverse-data/releases/download/draft_picks/draft_picks.csv'
-    draft_data = pd.read_csv(url)
-    draft_data_json = draft_data.to_json(orient='records')
-    draft_data_dict = json.loads(draft_data_json)
+# Response cache for the GET endpoints, keyed by blob name and blob ETag. With several
+# worker processes, SHARED_CACHE_DIR (a local directory) lets them map one shared copy
+# of each response body (query and player indexes stay per worker, see shared_cache.py)
+shared_cache_dir = os.getenv('SHARED_CACHE_DIR')
+blob_cache = BlobCache(
+    ttl=float(os.getenv('BLOB_CACHE_TTL', 60)),
+    max_bytes=int(os.getenv('BLOB_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+    shared=SharedCache(shared_cache_dir) if shared_cache_dir else None
+)
 
-    connection_string = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
-    container_name = 'nfl-draft-data'
-    blob_name = 'draft_picks_1980-2024.json'
+# Dataset layout: 'json' (one array per dataset), 'ndjson' (one record per line)
+# or 'parquet' (season partitions, see columnar.py)
+storage_format = os.getenv('STORAGE_FORMAT', 'json')
+ingest_chunk_rows = int(os.getenv('INGEST_CHUNK_ROWS', DEFAULT_CHUNK_ROWS))
+roster_seasons = sorted(parse_seasons(os.getenv('ROSTER_SEASONS', '2024')))
+# The latest refreshed season is the one the json/ndjson roster endpoints serve
+roster_blob = blob_name_for(f'roster_{roster_seasons[-1]}', storage_format)
+
+# nflverse release downloads; overridden to point the refreshes at a local mirror (see benchmarks/)
+nflverse_url = os.getenv('NFLVERSE_BASE_URL', 'https://github.com/nflverse/nflverse-data/releases/download')
+
+# Formats a response body is cached in; each is built (and compressed) once per blob version
+BODY_TYPES = {'json': 'application/json', 'ndjson': 'application/x-ndjson'}
+
+SEASONS_ERROR = "season must be a list of years or year ranges, e.g. 2020,2022-2024"
+
+# Worker pool for the fetch-and-upload refreshes
+job_runner = JobRunner(max_workers=int(os.getenv('JOB_WORKERS', 2)))
+
+def load_blob_response(container_name, blob_name, build=None, cache_name=None, fmt='json'):
+    cache_name = cache_name or blob_name
+    entry = blob_cache.get(container_name, cache_name)
+    if entry is not None and entry.is_fresh(blob_cache.ttl):
+        return entry
+
+    storage = get_storage()
+
+    # A stale entry only needs a properties call when the blob has not changed,
+    # or when another worker has already built the new version
+    if entry is not None:
+        etag = storage.get_properties(container_name, blob_name).etag
+        if etag == entry.etag:
+            entry.touch()
+            return entry
+        adopted = blob_cache.adopt(container_name, cache_name, etag)
+        if adopted is not None:
+            return adopted
+
+    with timed('fetch', container_name) as stage:
+        blob_data, props = storage.download(container_name, blob_name)
+        stage.bytes = len(blob_data)
+    return build_entry(container_name, blob_name, cache_name, blob_data, props.etag, build, fmt)
+
+def serialize(data, fmt='json'):
+    # Response body for a response format (see BODY_TYPES)
+    if fmt == 'ndjson':
+        return ''.join(app.json.dumps(row) + '\n' for row in data).encode('utf-8')
+    return app.json.response(data).get_data()
+
+def build_entry(container_name, blob_name, cache_name, blob_data, etag, build=None, fmt='json'):
+    # Everything after the download; app_async.py runs this on a worker thread
+    if not blob_data:
+        return None
+    with timed('parse', container_name, nbytes=len(blob_data)) as stage:
+        data = decode_blob(blob_name, blob_data)
+        stage.rows = len(data) if isinstance(data, list) else 0
+    if build is not None:
+        data = build(data)
+    # Serialize once per blob version instead of on every request
+    with timed('serialize', container_name, rows=len(data) if isinstance(data, list) else 0) as stage:
+        body = serialize(data, fmt)
+        stage.bytes = len(body)
+    return blob_cache.put(container_name, cache_name, etag, body)
 
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(container_name)
+def partitioned_source(container_name, prefix, seasons=None, columns=None):
+    # Only the seasons and columns this request needs are read, keyed on the manifest version
+    cache_name = (
+        f"{prefix}?seasons={','.join(map(str, sorted(seasons))) if seasons is not None else '*'}"
+        f"&columns={','.join(sorted(columns)) if columns is not None else '*'}"
+    )
 
+    def build(manifest):
+        return read_records(get_storage(), container_name, manifest, seasons=seasons, columns=columns)
+
+    return cache_name, build
+
+def parse_partition_args(args):
+    # Raises ValueError for a malformed season list
+    seasons = parse_seasons(args['season']) if args.get('season') else None
+    columns = None
+    if args.get('columns'):
+        # Filter fields have to be read too, even when they are projected away
+        columns = {c.strip() for c in args['columns'].split(',') if c.strip()}
+        columns |= {f for f in INDEXED_FIELDS if f in args}
+    return seasons, columns
+
+class Load:
+    # A cached blob response a view waits for; a list of them is loaded together
+    def __init__(self, container_name, blob_name, build=None, cache_name=None, optional=False, fmt='json'):
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.build = build
+        self.cache_name = cache_name
+        self.optional = optional  # None instead of NotFoundError when the blob is missing
+        self.fmt = fmt  # Body format the response is cached in, see BODY_TYPES
+
+
+class Compute:
+    # CPU-bound work a view waits for, e.g. building an index; app_async.py runs it on a worker thread
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+
+
+# Views take the framework's request and Response class and yield the Loads and Computes
+# they need, so the Flask routes here and the Quart routes in app_async.py share them
+ROUTES = []
+
+def route(rule, methods=('GET',)):
+    def register(view):
+        ROUTES.append((rule, list(methods), view))
+        app.add_url_rule(rule, view.__name__, lambda **kwargs: serve(view, **kwargs), methods=list(methods))
+        return view
+    return register
+
+def resolve(step):
+    if isinstance(step, list):
+        return [resolve(s) for s in step]
+    if isinstance(step, Compute):
+        return step.fn(*step.args)
     try:
-        container_client.create_container()
-    except azure.core.exceptions.ResourceExistsError:
-        pass  # Container already exists
-    except Exception as e:
-        print(f"Container cannot be created: {e}")
-        return jsonify({'error': f"Container cannot be created: {e}"}), 500
+        return load_blob_response(
+            step.container_name, step.blob_name, build=step.build, cache_name=step.cache_name, fmt=step.fmt
+        )
+    except NotFoundError:
+        if step.optional:
+            return None
+        raise
 
-    blob_client = container_client.get_blob_client(blob_name)
-    blob_client.upload_blob(json.dumps(draft_data_dict), overwrite=True)
+def serve(view, **kwargs):
+    steps = view(request, Response, **kwargs)
+    if not inspect.isgenerator(steps):
+        return steps
+    try:
+        step = next(steps)
+        while True:
+            try:
+                result = resolve(step)
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = steps.send(result)
+    except StopIteration as done:
+        return done.value
 
-    return jsonify({'message': 'Data fetched and uploaded successfully'})
+def json_response(response_class, data, status=200):
+    return response_class(app.json.dumps(data) + '\n', status=status, mimetype='application/json')
 
-@app.route('/get-draft-data', methods=['GET'])
-def get_draft_data():
-    connection_string = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
-    container_name = 'nfl-draft-data'
-    blob_name = 'draft_picks_1980-2024.json'
+def negotiate(request, etag):
+    # Encoding and ETag for a response built per request; both are known before it is built
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    return encoding, f"{etag}-{encoding}" if encoding else etag
+
+def finish_variant(response, encoding, variant_etag):
+    if encoding and response.status_code != 304:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(variant_etag)
+    return response
 
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    blob_client = blob_service_client.get_blob_client(container_name, blob_name)
+def encode_json(data, encoding=None):
+    body = (app.json.dumps(data) + '\n').encode('utf-8')
+    return compress(body, encoding) if encoding else body
+
+def query_etag(request, entry):
+    # Filtered and NDJSON responses get their own ETag derived from the dataset version and the query
+    etag = entry.etag.strip('"')
+    return f"{etag}-{hashlib.sha1(request.query_string).hexdigest()[:16]}"
+
+def send_query_result(request, response_class, entry):
+    encoding, variant_etag = negotiate(request, query_etag(request, entry))
+    if request.if_none_match.contains(variant_etag):
+        return finish_variant(response_class(status=304), encoding, variant_etag)
+    index = yield Compute(get_index, entry)
+    try:
+        filters, columns, cursor, limit = parse_query(request.args, index)
+    except ValueError as e:
+        return json_response(response_class, {"error": str(e)}, 400)
+    result = index.query(filters, columns=columns, cursor=cursor, limit=limit)
+    body = yield Compute(encode_json, result, encoding)
+    return finish_variant(response_class(body, mimetype='application/json'), encoding, variant_etag)
 
+def send_ndjson(request, response_class, entry):
+    # Filtered NDJSON; the unfiltered body is cached like the JSON one (see send_blob_json)
+    encoding, variant_etag = negotiate(request, query_etag(request, entry))
+    if request.if_none_match.contains(variant_etag):
+        return finish_variant(response_class(status=304), encoding, variant_etag)
+    index = yield Compute(get_index, entry)
     try:
-        blob_data = blob_client.download_blob().readall()
-        if not blob_data:
+        filters, columns, cursor, limit = parse_query(request.args, index)
+    except ValueError as e:
+        return json_response(response_class, {"error": str(e)}, 400)
+    rows = index.query(filters, columns=columns, cursor=cursor, limit=limit)['data']
+
+    # Rows are serialized (and compressed) as they are sent, in small batches
+    def generate():
+        batch = []
+        for row in rows:
+            batch.append(json.dumps(row) + '\n')
+            if len(batch) == 500:
+                yield ''.join(batch).encode('utf-8')
+                batch = []
+        if batch:
+            yield ''.join(batch).encode('utf-8')
+
+    chunks = compress_stream(generate(), encoding) if encoding else generate()
+    return finish_variant(response_class(chunks, mimetype='application/x-ndjson'), encoding, variant_etag)
+
+def send_cached_body(request, response_class, entry, fmt='json'):
+    # Serve the precompressed variant the client prefers, each with its own ETag
+    etag = entry.etag.strip('"')
+    if fmt != 'json':
+        etag = f"{etag}-{fmt}"
+    encoding = request.accept_encodings.best_match([e for e in ENCODINGS if e in entry.variants])
+    variant_etag = f"{etag}-{encoding}" if encoding else etag
+    if request.if_none_match.contains(variant_etag):
+        response = response_class(status=304)
+    elif encoding:
+        response = response_class(response_body(entry.variants[encoding]), mimetype=BODY_TYPES[fmt])
+        response.content_length = len(entry.variants[encoding])
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = response_class(response_body(entry.body), mimetype=BODY_TYPES[fmt])
+        response.content_length = len(entry.body)
+    response.vary.add('Accept-Encoding')
+    response.set_etag(variant_etag)
+    return response
+
+def send_blob_json(request, response_class, container_name, blob_name, queryable=False, partition_prefix=None):
+    partitioned = partition_prefix and storage_format == 'parquet'
+    seasons = columns = None
+    if queryable and partitioned:
+        try:
+            seasons, columns = parse_partition_args(request.args)
+        except ValueError:
+            return json_response(response_class, {"error": SEASONS_ERROR}, 400)
+
+    ndjson = queryable and request.args.get('format') == 'ndjson'
+    filtered = queryable and has_query(request.args)
+    # Unfiltered NDJSON is cached next to the JSON body, under the same name with a #ndjson suffix
+    fmt = 'ndjson' if ndjson and not filtered else 'json'
+    try:
+        if partitioned:
+            cache_name, build = partitioned_source(container_name, partition_prefix, seasons, columns)
+            source_blob = manifest_blob(partition_prefix)
+        else:
+            cache_name, build, source_blob = blob_name, None, blob_name
+        if fmt != 'json':
+            cache_name = f'{cache_name}#{fmt}'
+        entry = yield Load(container_name, source_blob, build=build, cache_name=cache_name, fmt=fmt)
+        if entry is None:
             print(f"Blob {blob_name} is empty")
-            return jsonify({"error": "The blob is empty."}), 404
-        draft_data = json.loads(blob_data)
-        return jsonify(draft_data)
-    except azure.core.exceptions.ResourceNotFoundError:
+            return json_response(response_class, {"error": "The blob is empty."}, 404)
+        if ndjson and filtered:
+            return (yield from send_ndjson(request, response_class, entry))
+        if filtered:
+            return (yield from send_query_result(request, response_class, entry))
+        return send_cached_body(request, response_class, entry, fmt)
+    except NotFoundError:
         print(f"Blob {blob_name} not found in container {container_name}")
-        return jsonify({"error": "The specified blob does not exist."}), 404
+        return json_response(response_class, {"error": "The specified blob does not exist."}, 404)
     except json.JSONDecodeError as json_error:
         print(f"Error decoding JSON: {json_error}")
-        return jsonify({"error": "Failed to parse JSON data from the blob."}), 500
+        return json_response(response_class, {"error": "Failed to parse JSON data from the blob."}, 500)
     except Exception as e:
         print(f"An error occurred: {e}")
-        return jsonify({"error": f"An error occurred while fetching the data: {e}"}), 500
+        return json_response(response_class, {"error": f"An error occurred while fetching the data: {e}"}, 500)
+
+def refresh_draft_data(job):
+    url = f'{nflverse_url}/draft_picks/draft_picks.csv'
+
+    container_name = 'nfl-draft-data'
+    blob_name = blob_name_for('draft_picks_1980-2024', storage_format)
+    partition_prefix = 'draft_picks'
 
-@app.route('/fetch-and-upload-roster-data', methods=['POST'])
-def fetch_and_upload_roster_data():
-    url = 'https://github.com/nflverse/nflverse-data/releases/download/rosters/roster_2024.csv'
+    storage = get_storage()
     try:
-        roster_data = pd.read_csv(url)
-        roster_data_json = roster_data.to_json(orient='records')
+        storage.ensure_container(container_name)
+    except Exception as e:
+        raise RuntimeError(f"Container cannot be created: {e}") from e
 
-        connection_string = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
-        container_name = 'nfl-roster-data'
-        blob_name = 'roster_2024.json'
+    # Rollups are built while the CSV is read; without them the refresh cannot be skipped
+    draft_rollups = DraftRollups()
+    conditional = rollups_exist(storage, container_name)
 
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        container_client = blob_service_client.get_container_client(container_name)
+    if storage_format == 'parquet':
+        previous = {}
+        if conditional:
+            try:
+                previous = read_manifest(storage, container_name, partition_prefix)[0].get('source', {})
+            except NotFoundError:
+                pass
+        with timed('fetch', container_name) as stage:
+            response = open_csv_stream(url, previous)
+            raw = response.content if response is not None else b''
+            stage.bytes = len(raw)
+        if response is None:
+            return {'message': 'Source not modified, upload skipped'}
+        job.report(bytes_moved=len(raw))
+        source = dict(source_metadata(response), content_sha256=hashlib.sha256(raw).hexdigest())
+        if source['content_sha256'] == previous.get('content_sha256'):
+            return {'message': 'Data unchanged, upload skipped'}
+        # One file holds every season, so it is split into partitions in memory
+        with timed('parse', container_name, nbytes=len(raw)) as stage:
+            draft_data = pd.read_csv(io.BytesIO(raw))
+            stage.rows = len(draft_data)
+        with timed('upload', container_name, rows=len(draft_data)):
+            manifest = write_partitions(storage, container_name, partition_prefix, draft_data, source=source)
+        job.report(rows=manifest['rows'])
+        with timed('transform', container_name, rows=len(draft_data)):
+            draft_rollups.add(draft_data)
+        blob_cache.invalidate_prefix(container_name, partition_prefix)
+    else:
+        # Stream the CSV into staged blocks without materializing the whole file
+        result = stream_csv_to_blob(
+            url, storage, container_name, blob_name, fmt=storage_format, chunk_rows=ingest_chunk_rows,
+            progress=job.report, conditional=conditional, on_chunk=draft_rollups.add
+        )
+        if result['unchanged']:
+            return {'message': 'Data unchanged, upload skipped'}
+        source = {'content_sha256': result['sha256']}
+        blob_cache.invalidate_prefix(container_name, blob_name)  # Also the #ndjson body
 
-        try:
-            container_client.create_container()
-        except azure.core.exceptions.ResourceExistsError:
-            pass  # Container already exists
-        except Exception as e:
-            print(f"Container cannot be created: {e}")
-            return jsonify({'error': f"Container cannot be created: {e}"}), 500
+    # Only seasons whose data changed get their rollup rewritten
+    job.report(message='Updating rollups')
+    rollup_seasons = write_rollups(storage, container_name, draft_rollups, source=source)
+    blob_cache.invalidate_prefix(container_name, ROLLUP_PREFIX)
 
-        blob_client = container_client.get_blob_client(blob_name)
-        blob_client.upload_blob(roster_data_json, overwrite=True)
+    return {'message': 'Data fetched and uploaded successfully', 'rollup_seasons': rollup_seasons}
 
-        return jsonify({'message': 'Data fetched and uploaded successfully'})
+def refresh_roster_data(job):
+    container_name = 'nfl-roster-data'
+    partition_prefix = 'roster'
+
+    storage = get_storage()
+    try:
+        storage.ensure_container(container_name)
     except Exception as e:
-        print(f"An error occurred: {e}")
-        return jsonify({'error': f'An error occurred: {e}'}), 500
+        raise RuntimeError(f"Container cannot be created: {e}") from e
+
+    # Each season file is streamed straight into its own blob (ROSTER_SEASONS, e.g. 2020-2024)
+    partitions = []
+    columns = []
+    snapshot_weeks = {}
+    for season in roster_seasons:
+        job.report(message=f"Uploading roster {season}")
+        url = f'{nflverse_url}/rosters/roster_{season}.csv'
+        if storage_format == 'parquet':
+            blob_name = partition_blob(partition_prefix, season)
+        else:
+            blob_name = blob_name_for(f'roster_{season}', storage_format)
+        # Without a snapshot history the season is not skipped, so the history gets its base
+        result = stream_csv_to_blob(
+            url, storage, container_name, blob_name, fmt=storage_format, chunk_rows=ingest_chunk_rows,
+            progress=job.report, conditional=snapshots_exist(storage, container_name, season)
+        )
+        if result['unchanged']:
+            continue
+        partitions.append({'season': season, 'blob': blob_name, 'rows': result['rows']})
+        columns += [c for c in result['columns'] if c not in columns]
+        blob_cache.invalidate_prefix(container_name, blob_name)  # Also the #ndjson body
+
+        # Snapshots are built from the committed blob once the upload is done, so the ingest
+        # itself keeps only one chunk in memory; only the difference from the latest stored week is uploaded.
+        # The season blob above is still rewritten in full, since it is what /get-roster-data serves
+        job.report(message=f"Updating roster snapshots {season}")
+        weeks = record_snapshot(storage, container_name, season, read_blob_records(storage, container_name, blob_name))
+        if weeks:
+            snapshot_weeks[season] = weeks
+            blob_cache.invalidate_prefix(container_name, snapshot_manifest_blob(season))
+
+    if not partitions:
+        return {'message': 'Data unchanged, upload skipped'}
+    if storage_format == 'parquet':
+        update_manifest(storage, container_name, partition_prefix, partitions, columns)
+        blob_cache.invalidate_prefix(container_name, partition_prefix)
+
+    return {
+        'message': 'Data fetched and uploaded successfully', 'seasons': [p['season'] for p in partitions],
+        'snapshot_weeks': snapshot_weeks
+    }
+
+def submit_job(response_class, key, fn):
+    job, created = job_runner.submit(key, fn)
+    body = job.to_dict()
+    body['status_url'] = f"/jobs/{job.id}"
+    body['coalesced'] = not created
+    return json_response(response_class, body, 202)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.registry.observe_request(endpoint, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+@route('/metrics')
+def get_metrics(request, response_class):
+    # Prometheus text format: per-stage durations, rows and bytes, and request latencies
+    return response_class(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@route('/jobs/<job_id>')
+def get_job_status(request, response_class, job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return json_response(response_class, {"error": "The specified job does not exist."}, 404)
+    return json_response(response_class, job.to_dict())
+
+@route('/jobs')
+def list_jobs(request, response_class):
+    return json_response(response_class, [job.to_dict() for job in job_runner.list()])
 
-@app.route('/get-roster-data', methods=['GET'])
-def get_roster_data():
-    connection_string = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
+@route('/fetch-and-upload-draft-data', methods=['POST'])
+def fetch_and_upload_draft_data(request, response_class):
+    # Runs in the background; poll the returned status_url for progress
+    return submit_job(response_class, 'draft', refresh_draft_data)
+
+@route('/get-draft-data')
+def get_draft_data(request, response_class):
+    container_name = 'nfl-draft-data'
+    blob_name = blob_name_for('draft_picks_1980-2024', storage_format)
+
+    # Optional filters: season, team, round, position, gsis_id; paging: columns, limit, cursor;
+    # format=ndjson streams one record per line
+    return send_blob_json(request, response_class, container_name, blob_name, queryable=True, partition_prefix='draft_picks')
+
+def aggregate_source(container_name, name, seasons=None):
+    cache_name = f"{ROLLUP_PREFIX}/{name}?seasons={','.join(map(str, sorted(seasons))) if seasons else '*'}"
+
+    def build(manifest):
+        return read_rollup(get_storage(), container_name, manifest, name, seasons)
+
+    return cache_name, build
+
+@route('/get-draft-aggregates/<name>')
+def get_draft_aggregates(request, response_class, name):
+    # Served from the rollups materialized by the draft refresh; optional season=2020,2022-2024
+    if name not in ROLLUPS:
+        return json_response(response_class, {"error": f"Unknown aggregate, expected one of {', '.join(ROLLUPS)}"}, 404)
+    container_name = 'nfl-draft-data'
+    try:
+        seasons = parse_seasons(request.args['season']) if request.args.get('season') else None
+    except ValueError:
+        return json_response(response_class, {"error": SEASONS_ERROR}, 400)
+    cache_name, build = aggregate_source(container_name, name, seasons)
+    try:
+        entry = yield Load(container_name, manifest_blob(ROLLUP_PREFIX), build=build, cache_name=cache_name)
+    except NotFoundError:
+        return json_response(
+            response_class, {"error": "Aggregates have not been built yet; POST /fetch-and-upload-draft-data first."}, 404
+        )
+    return send_cached_body(request, response_class, entry)
+
+@route('/fetch-and-upload-roster-data', methods=['POST'])
+def fetch_and_upload_roster_data(request, response_class):
+    # Runs in the background; poll the returned status_url for progress
+    return submit_job(response_class, 'roster', refresh_roster_data)
+
+@route('/get-roster-data')
+def get_roster_data(request, response_class):
     container_name = 'nfl-roster-data'
-    blob_name = 'roster_2024.json'
+    blob_name = roster_blob
+
+    # Optional filters: season, team, position, gsis_id; paging: columns, limit, cursor;
+    # format=ndjson streams one record per line; as_of_week=N returns the roster as of week N
+    if request.args.get('as_of_week'):
+        return send_roster_snapshot(request, response_class, container_name)
+    return send_blob_json(request, response_class, container_name, blob_name, queryable=True, partition_prefix='roster')
+
+SNAPSHOT_ARGS_ERROR = "as_of_week and season must be integers, e.g. as_of_week=5&season=2024"
+
+def snapshot_source(container_name, season, week):
+    # Rebuilt from the nearest cached checkpoint plus the deltas after it (see snapshots.py)
+    manifest_name = snapshot_manifest_blob(season)
 
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    blob_client = blob_service_client.get_blob_client(container_name, blob_name)
+    def build(manifest):
+        state = snapshot_reader.state_as_of(get_storage(), container_name, manifest, week)
+        return present_snapshot(state, week) if state is not None else []
 
+    return manifest_name, f"{manifest_name}?as_of_week={week}", build
+
+def send_roster_snapshot(request, response_class, container_name):
     try:
-        blob_data = blob_client.download_blob().readall()
-        if not blob_data:
-            print(f"Blob {blob_name} is empty")
-            return jsonify({"error": "The blob is empty."}), 404
-        roster_data = json.loads(blob_data)
-        return jsonify(roster_data)
-    except azure.core.exceptions.ResourceNotFoundError:
-        print(f"Blob {blob_name} not found in container {container_name}")
-        return jsonify({"error": "The specified blob does not exist."}), 404
+        week = int(request.args['as_of_week'])
+        season = int(request.args.get('season', roster_seasons[-1]))
+    except ValueError:
+        return json_response(response_class, {"error": SNAPSHOT_ARGS_ERROR}, 400)
+    manifest_name, cache_name, build = snapshot_source(container_name, season, week)
+    try:
+        entry = yield Load(container_name, manifest_name, build=build, cache_name=cache_name)
+    except NotFoundError:
+        return json_response(
+            response_class, {"error": f"No roster snapshots for season {season}; POST /fetch-and-upload-roster-data first."}, 404
+        )
+    return send_cached_body(request, response_class, entry)
+
+def player_source(container_name, blob_name, partition_prefix=None):
+    # Same data the GET endpoint for the dataset serves; None when it has not been uploaded
+    if partition_prefix and storage_format == 'parquet':
+        cache_name, build = partitioned_source(container_name, partition_prefix)
+        return Load(container_name, manifest_blob(partition_prefix), build=build, cache_name=cache_name, optional=True)
+    return Load(container_name, blob_name, optional=True)
+
+@route('/players/<player_id>')
+def get_player(request, response_class, player_id):
+    # Accepts a gsis, PFR, ESPN, CFB or other roster id; returns the merged draft/roster/schedule profile.
+    # ?id_type=espn_id (etc.) picks the namespace when the bare id belongs to more than one player.
+    id_type = request.args.get('id_type')
+    if id_type is not None and id_type not in ID_TYPES:
+        return json_response(response_class, {"error": f"id_type must be one of: {', '.join(ID_TYPES)}"}, 400)
+    sources = {
+        'draft': player_source('nfl-draft-data', blob_name_for('draft_picks_1980-2024', storage_format), 'draft_picks'),
+        'roster': player_source('nfl-roster-data', roster_blob, 'roster'),
+        'schedule': player_source('nflschedule1e835d00-19e7-11ef-bf0e-0ddb63396b97', 'TEN_schedule_2024.json')
+    }
+    try:
+        entries = yield list(sources.values())
+        # Rebuilding the index after a refresh is CPU work
+        index = yield Compute(get_player_index, dict(zip(sources, entries)))
+        keys = index.matches(player_id, id_type)
+        if not keys:
+            return json_response(response_class, {"error": "No player with that id."}, 404)
+        if len(keys) > 1:
+            return json_response(response_class, {
+                "error": "That id belongs to more than one player; pass id_type to choose one.",
+                "candidates": [index.candidate(key, player_id) for key in keys]
+            }, 409)
+        return json_response(response_class, index.profile(keys[0]))
+    except NotFoundError:
+        print(f"Player sources not found for {player_id}")
+        return json_response(response_class, {"error": "The specified blob does not exist."}, 404)
     except json.JSONDecodeError as json_error:
         print(f"Error decoding JSON: {json_error}")
-        return jsonify({"error": "Failed to parse JSON data from the blob."}), 500
+        return json_response(response_class, {"error": "Failed to parse JSON data from the blob."}, 500)
     except Exception as e:
         print(f"An error occurred: {e}")
-        return jsonify({"error": f"An error occurred while fetching the data: {e}"}), 500
+        return json_response(response_class, {"error": f"An error occurred while fetching the data: {e}"}, 500)
 
-@app.route('/get-schedule-data', methods=['GET'])
-def get_schedule_data():
-    connection_string = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
+@route('/get-schedule-data')
+def get_schedule_data(request, response_class):
     container_name = 'nflschedule1e835d00-19e7-11ef-bf0e-0ddb63396b97'
     blob_name = 'TEN_schedule_2024.json'
 
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    blob_client = blob_service_client.get_blob_client(container_name, blob_name)
-
-    try:
-        blob_data = blob_client.download_blob().readall()
-        if not blob_data:
-            print(f"Blob {blob_name} is empty")
-            return jsonify({"error": "The blob is empty."}), 404
-        schedule_data = json.loads(blob_data)
-        return jsonify(schedule_data)
-    except azure.core.exceptions.ResourceNotFoundError:
-        print(f"Blob {blob_name} not found in container {container_name}")
-        return jsonify({"error": "The specified blob does not exist."}), 404
-    except json.JSONDecodeError as json_error:
-        print(f"Error decoding JSON: {json_error}")
-        return jsonify({"error": "Failed to parse JSON data from the blob."}), 500
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return jsonify({"error": f"An error occurred while fetching the data: {e}"}), 500
+    return send_blob_json(request, response_class, container_name, blob_name)
 
 if __name__ == '__main__':
+    # Development server; app_async.py is the production serving mode
     app.run(debug=True, port=5002)
\ No newline at end of file
@@ -0,0 +1,179 @@
+import asyncio
+import inspect
+import os
+import time
+
+from quart import Quart, Response, g, request
+from quart_cors import cors
+
+import app as wsgi
+import metrics
+from metrics import timed
+from storage import NotFoundError, close_async_storage, get_async_storage
+
+# Production serving mode: the routes and responses of app.py on Quart, e.g.
+#
+#   hypercorn app_async:app --bind 0.0.0.0:5002 --workers 2
+#
+# Blob downloads go through the async storage client, so a slow read only holds up the
+# requests waiting for that blob. Concurrent misses for the same response share one
+# download and build (single-flight), and both the number of requests in progress and
+# the number of blob downloads are capped. The views are app.py's: they yield the blob
+# loads and CPU-bound steps they need, which are awaited here, with parsing, derived
+# reads (partitions, rollups, snapshots), serialization and index builds on worker
+# threads. The response cache and the refresh job runner are app.py's too.
+
+# Requests handled at once; beyond that up to ASYNC_REQUEST_BACKLOG wait, the rest get a 503
+max_requests = int(os.getenv('ASYNC_MAX_REQUESTS', 1000))
+request_backlog = int(os.getenv('ASYNC_REQUEST_BACKLOG', 5000))
+# Blob downloads in flight at once
+blob_concurrency = int(os.getenv('ASYNC_BLOB_CONCURRENCY', 32))
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        # The first caller starts fn(); later callers with the same key await its result
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is done else None)
+        # A client disconnecting must not cancel the download the others are waiting for
+        return await asyncio.shield(task)
+
+
+class ConcurrencyLimit:
+    # ASGI middleware capping the requests in progress
+    def __init__(self, asgi_app, limit, backlog):
+        self.asgi_app = asgi_app
+        self.backlog = backlog
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(limit)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.asgi_app(scope, receive, send)
+        if self._slots.locked() and self.waiting >= self.backlog:
+            await send({
+                'type': 'http.response.start', 'status': 503,
+                'headers': [(b'content-type', b'application/json'), (b'retry-after', b'1')]
+            })
+            await send({'type': 'http.response.body', 'body': b'{"error": "Server busy, retry shortly."}'})
+            return
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            await self.asgi_app(scope, receive, send)
+        finally:
+            self._slots.release()
+
+
+app = cors(Quart(__name__))  # Enable CORS for all routes
+app.asgi_app = ConcurrencyLimit(app.asgi_app, max_requests, request_backlog)
+
+flights = SingleFlight()
+blob_slots = asyncio.Semaphore(blob_concurrency)
+
+
+async def load_blob_response(container_name, blob_name, build=None, cache_name=None, fmt='json'):
+    cache_name = cache_name or blob_name
+    entry = wsgi.blob_cache.get(container_name, cache_name)
+    if entry is not None and entry.is_fresh(wsgi.blob_cache.ttl):
+        return entry
+    return await flights.do(
+        (container_name, cache_name), lambda: fetch_entry(container_name, blob_name, cache_name, build, fmt, entry)
+    )
+
+
+async def fetch_entry(container_name, blob_name, cache_name, build, fmt, entry):
+    storage = get_async_storage()
+    async with blob_slots:
+        # A stale entry only needs a properties call when the blob has not changed,
+        # or when another worker has already built the new version
+        if entry is not None:
+            etag = (await storage.get_properties(container_name, blob_name)).etag
+            if etag == entry.etag:
+                entry.touch()
+                return entry
+            adopted = wsgi.blob_cache.adopt(container_name, cache_name, etag)
+            if adopted is not None:
+                return adopted
+        with timed('fetch', container_name) as stage:
+            blob_data, props = await storage.download(container_name, blob_name)
+            stage.bytes = len(blob_data)
+    return await asyncio.to_thread(
+        wsgi.build_entry, container_name, blob_name, cache_name, blob_data, props.etag, build, fmt
+    )
+
+
+async def resolve(step):
+    if isinstance(step, list):
+        return list(await asyncio.gather(*(resolve(s) for s in step)))
+    if isinstance(step, wsgi.Compute):
+        return await asyncio.to_thread(step.fn, *step.args)
+    try:
+        return await load_blob_response(
+            step.container_name, step.blob_name, build=step.build, cache_name=step.cache_name, fmt=step.fmt
+        )
+    except NotFoundError:
+        if step.optional:
+            return None
+        raise
+
+
+async def serve(view, **kwargs):
+    # Drives one of app.py's views, awaiting the loads and computes it yields
+    steps = view(request, Response, **kwargs)
+    if not inspect.isgenerator(steps):
+        return steps
+    try:
+        step = next(steps)
+        while True:
+            try:
+                result = await resolve(step)
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = steps.send(result)
+    except StopIteration as done:
+        return done.value
+
+
+def handler(view):
+    async def handle(**kwargs):
+        return await serve(view, **kwargs)
+    handle.__name__ = view.__name__
+    return handle
+
+
+for rule, methods, view in wsgi.ROUTES:
+    app.add_url_rule(rule, view.__name__, handler(view), methods=methods)
+
+
+@app.before_request
+async def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+async def record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.registry.observe_request(endpoint, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+
+@app.after_serving
+async def close_storage():
+    await close_async_storage()
+
+
+if __name__ == '__main__':
+    app.run(port=5002)
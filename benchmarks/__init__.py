@@ -0,0 +1 @@
+# Offline benchmarks for the ingest, SQL load and serving paths; see benchmarks/run.py.
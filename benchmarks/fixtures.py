@@ -0,0 +1,145 @@
+import csv
+import json
+import os
+import random
+import sys
+
+import requests
+
+from datasets import DRAFT_COLUMNS, ROSTER_COLUMNS
+from espn import NFL_TEAMS, TEAM_URL
+
+# Fixtures for the offline benchmarks, laid out like the upstream servers:
+#
+#   draft_picks/draft_picks.csv      nflverse draft picks
+#   rosters/roster_{season}.csv      nflverse weekly rosters
+#   espn/TEN_schedule.json           ESPN team schedule payload
+#
+# `python -m benchmarks.fixtures --record DIR` downloads the real files once; without
+# recorded fixtures the benchmarks generate synthetic files of the same shape and size
+# from a fixed seed, so runs on different machines see the same data.
+
+DRAFT_SEASONS = range(1980, 2025)
+ROSTER_SEASONS = (2022, 2023, 2024)
+NFLVERSE_URL = 'https://github.com/nflverse/nflverse-data/releases/download'
+POSITIONS = ['QB', 'RB', 'WR', 'TE', 'T', 'G', 'C', 'DE', 'DT', 'LB', 'CB', 'S', 'K', 'P']
+COLLEGES = ['Alabama', 'Ohio St.', 'Georgia', 'LSU', 'Michigan', 'USC', 'Clemson', 'Florida', 'Texas', 'Oklahoma']
+
+
+def draft_path(root):
+    return os.path.join(root, 'draft_picks', 'draft_picks.csv')
+
+
+def roster_path(root, season):
+    return os.path.join(root, 'rosters', f'roster_{season}.csv')
+
+
+def schedule_path(root):
+    return os.path.join(root, 'espn', 'TEN_schedule.json')
+
+
+def has_fixtures(root):
+    return os.path.exists(draft_path(root)) and os.path.exists(schedule_path(root)) and all(
+        os.path.exists(roster_path(root, s)) for s in ROSTER_SEASONS
+    )
+
+
+def write_csv(path, columns, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def draft_row(rng, season, pick):
+    values = {
+        'season': season, 'round': (pick - 1) // 32 + 1, 'pick': pick, 'team': rng.choice(NFL_TEAMS),
+        'gsis_id': f'00-00{rng.randrange(10 ** 5):05d}' if season >= 2000 else '',
+        'pfr_player_id': f'Play{season}{pick:03d}', 'cfb_player_id': f'player-{season}-{pick}',
+        'pfr_player_name': f'Player {season}-{pick}', 'hof': rng.random() < 0.01,
+        'position': rng.choice(POSITIONS), 'college': rng.choice(COLLEGES), 'age': rng.randint(20, 24),
+        'to': season + rng.randint(0, 12), 'car_av': rng.randint(0, 120)
+    }
+    # Remaining stat columns are small counts, often empty as in the real file
+    return [values.get(c, rng.randint(0, 50) if rng.random() < 0.6 else '') for c in DRAFT_COLUMNS]
+
+
+def roster_row(rng, season, week, number):
+    values = {
+        'season': season, 'week': week, 'team': NFL_TEAMS[number % len(NFL_TEAMS)],
+        'gsis_id': f'00-{season % 100:02d}{number:05d}', 'full_name': f'Player {number}',
+        'first_name': 'Player', 'last_name': str(number), 'position': rng.choice(POSITIONS),
+        'college': rng.choice(COLLEGES), 'status': 'ACT', 'game_type': 'REG', 'birth_date': '1998-01-01',
+        'headshot_url': f'https://static.www.nfl.com/image/upload/headshots/{number}.png',
+        'height': rng.randint(68, 80), 'weight': rng.randint(170, 340), 'jersey_number': rng.randint(1, 99),
+        'years_exp': rng.randint(0, 15), 'entry_year': season - rng.randint(0, 15)
+    }
+    return [values.get(c, f'{c}-{number}') for c in ROSTER_COLUMNS]
+
+
+def espn_event(rng, event_id, season, week):
+    home, away = rng.sample(NFL_TEAMS, 2)
+
+    def competitor(team, side):
+        return {
+            'homeAway': side,
+            'team': {
+                'id': str(NFL_TEAMS.index(team) + 1), 'location': team, 'nickname': team, 'abbreviation': team,
+                'displayName': f'{team} Team', 'shortDisplayName': team,
+                'logos': [{'href': f'https://a.espncdn.com/i/teamlogos/nfl/500/{team}.png', 'width': 500,
+                           'height': 500, 'alt': '', 'rel': ['full', 'default']}]
+            }
+        }
+
+    return {
+        'id': str(event_id),
+        'date': f'{season}-{9 + week // 5:02d}-{1 + week % 28:02d}T17:00Z',
+        'name': f'{away} at {home}', 'shortName': f'{away} @ {home}',
+        'season': {'year': season, 'displayName': str(season)},
+        'seasonType': {'id': '2', 'name': 'Regular Season'},
+        'week': {'number': week, 'text': f'Week {week}'},
+        'competitions': [{
+            'competitors': [competitor(home, 'home'), competitor(away, 'away')],
+            'venue': {'fullName': f'{home} Stadium', 'address': {'city': home, 'state': 'TN', 'zipCode': '37213'}},
+            'broadcasts': [{'media': {'shortName': rng.choice(['CBS', 'FOX', 'NBC', 'ESPN'])}}]
+        }]
+    }
+
+
+def generate(root, seed=2024, roster_players=3000):
+    # Sizes follow the real files: ~260 picks a season since 1980, ~3k players per roster season
+    rng = random.Random(seed)
+    write_csv(draft_path(root), DRAFT_COLUMNS, [
+        draft_row(rng, season, pick) for season in DRAFT_SEASONS for pick in range(1, 225 if season >= 1994 else 337)
+    ])
+    for season in ROSTER_SEASONS:
+        write_csv(roster_path(root, season), ROSTER_COLUMNS, [
+            roster_row(rng, season, 1, number) for number in range(roster_players)
+        ])
+    events = [espn_event(rng, 401000000 + n, 2024, n % 18 + 1) for n in range(272)]
+    os.makedirs(os.path.dirname(schedule_path(root)), exist_ok=True)
+    with open(schedule_path(root), 'w') as f:
+        json.dump({'events': events}, f)
+
+
+def download(url, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    with open(path, 'wb') as f:
+        f.write(response.content)
+
+
+def record(root):
+    download(f'{NFLVERSE_URL}/draft_picks/draft_picks.csv', draft_path(root))
+    for season in ROSTER_SEASONS:
+        download(f'{NFLVERSE_URL}/rosters/roster_{season}.csv', roster_path(root, season))
+    download(TEAM_URL, schedule_path(root))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] not in ('--record', '--generate'):
+        sys.exit('usage: python -m benchmarks.fixtures --record|--generate DIR')
+    (record if sys.argv[1] == '--record' else generate)(sys.argv[2])
+    print(f"Fixtures written to {sys.argv[2]}")
@@ -0,0 +1,331 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import fixtures
+
+# Offline benchmark suite for the ingest, SQL load and serving paths.
+#
+#   python -m benchmarks.run [--output bench_results.json] [--compare baseline.json]
+#
+# Everything runs locally: blobs go to a LocalStorage directory, the nflverse downloads
+# are served from the fixtures by a local HTTP server (NFLVERSE_BASE_URL), and SQL writes
+# go to SQLite through benchmarks.sqlite_sink. Results are written as JSON; --compare
+# diffs them against an earlier run and exits non-zero when a metric regressed by more
+# than --threshold.
+#
+#   loaders    rows/sec per dataset and load mode through pipeline.run / run_partitioned, with write time
+#   endpoints  latency percentiles per GET endpoint, warm (cached) and cold
+#   refresh    wall time and peak RSS of each fetch-and-upload path, one subprocess each
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEDULE_CONTAINER = 'nflschedule1e835d00-19e7-11ef-bf0e-0ddb63396b97'
+SUITES = ('loaders', 'endpoints', 'refresh')
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(root):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=root))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def bench_env(storage_dir, base_url, fmt):
+    return {
+        'STORAGE_BACKEND': 'local',
+        'LOCAL_STORAGE_DIR': storage_dir,
+        'NFLVERSE_BASE_URL': base_url,
+        'STORAGE_FORMAT': fmt,
+        'ROSTER_SEASONS': ','.join(map(str, fixtures.ROSTER_SEASONS))
+    }
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # bytes on macOS, KiB on Linux
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+
+def latency_summary(samples):
+    ms = [s * 1000 for s in samples]
+    return {
+        'n': len(ms),
+        'mean_ms': round(sum(ms) / len(ms), 3),
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(max(ms), 3)
+    }
+
+
+def refresh_child(target):
+    # Runs in its own process so ru_maxrss is the peak of this refresh alone
+    import app as server
+    from jobs import Job
+
+    import_rss = peak_rss_kb()
+    job = Job(target)
+    start = time.perf_counter()
+    result = (server.refresh_draft_data if target == 'draft' else server.refresh_roster_data)(job)
+    print(json.dumps({
+        'seconds': round(time.perf_counter() - start, 3),
+        'bytes': job.bytes_moved,
+        'rows': job.rows,
+        'import_rss_kb': import_rss,
+        'peak_rss_kb': peak_rss_kb(),
+        'message': result['message']
+    }))
+
+
+def bench_refresh(base_url, fmt):
+    results = {}
+    for target in ('draft', 'roster'):
+        with tempfile.TemporaryDirectory() as storage_dir:
+            env = dict(os.environ, **bench_env(storage_dir, base_url, fmt))
+            completed = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.run', '--refresh-child', target],
+                cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+            )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result['mb_per_sec'] = round(result['bytes'] / 1e6 / result['seconds'], 2) if result['seconds'] else None
+        results[target] = result
+        print(f"refresh {target}: {result['seconds']}s, peak RSS {result['peak_rss_kb'] // 1024} MiB")
+    return results
+
+
+def populate(fixtures_root):
+    # Blobs for the loaders and GET endpoints, written through the real refresh paths
+    import app as server
+    from jobs import Job
+    from storage import get_storage
+
+    server.refresh_draft_data(Job('draft'))
+    server.refresh_roster_data(Job('roster'))
+    storage = get_storage()
+    storage.ensure_container(SCHEDULE_CONTAINER)
+    with open(fixtures.schedule_path(fixtures_root), 'rb') as f:
+        storage.upload(SCHEDULE_CONTAINER, 'TEN_schedule_2024.json', f.read(), overwrite=True)
+
+
+def bench_loaders(fixtures_root, fmt, work_dir):
+    import espn
+    import pipeline
+    from benchmarks.sqlite_sink import SqliteSink, local_load_state
+    from connections import ConnectionPool
+    from datasets import DRAFT, ROSTER, schedule_spec
+    from pipeline import RecordSource
+    from storage import get_storage
+
+    with open(fixtures.schedule_path(fixtures_root)) as f:
+        events = json.load(f)['events']
+
+    results = {}
+    start = time.perf_counter()
+    schedule_df, _ = espn.normalize_schedule(events)
+    seconds = time.perf_counter() - start
+    results['normalize_schedule'] = {
+        'events': len(events), 'seconds': round(seconds, 4), 'events_per_sec': round(len(events) / seconds, 1)
+    }
+
+    schedule = schedule_spec('team')
+    schedule.source = RecordSource('fixture', lambda: schedule_df)
+    datasets = [(DRAFT, None), (ROSTER, set(fixtures.ROSTER_SEASONS)), (schedule, None)]
+    storage = get_storage()
+
+    # The production loaders (pipeline.run, and run_partitioned on a pool of 4) with SQLite as the sink
+    runs = [('row', 1), ('bulk', 1), ('bulk', 4)]
+    for base_spec, seasons in datasets:
+        for mode, connections in runs:
+            spec = copy.copy(base_spec)
+            spec.sink = SqliteSink(base_spec.sink)
+            path = os.path.join(work_dir, f'{spec.name}_{mode}_{connections}.sqlite')
+            connect = partial(sqlite3.connect, path, timeout=60, check_same_thread=False)
+            conn = connect()
+            spec.sink.create_table(conn, spec.columns)
+
+            start = time.perf_counter()
+            with local_load_state():
+                if connections > 1:
+                    pool = ConnectionPool(connect, size=connections)
+                    totals = pipeline.run_partitioned(
+                        spec, pool, storage=storage, mode=mode, fmt=fmt, seasons=seasons, force=True
+                    )
+                    pool.close()
+                else:
+                    totals = pipeline.run(spec, conn, storage=storage, mode=mode, fmt=fmt, seasons=seasons, force=True)
+            total = time.perf_counter() - start
+            conn.close()
+
+            rows = sum(totals.values())
+            name = f'{spec.name}_{mode}' if connections == 1 else f'{spec.name}_{mode}_x{connections}'
+            results[name] = {
+                'rows': rows,
+                'seconds': round(total, 4),
+                'write_seconds': round(spec.sink.write_seconds, 4),
+                'rows_per_sec': round(rows / total, 1) if total else None
+            }
+            print(f"load {name}: {rows} rows, {results[name]['rows_per_sec']} rows/s")
+    return results
+
+
+def bench_endpoints(request_count, cold_count):
+    import app as server
+    from blob_cache import BlobCache
+
+    client = server.app.test_client()
+    draft_etag = client.get('/get-draft-data').headers.get('ETag')
+    cases = {
+        'draft_full': ('/get-draft-data', {}),
+        'draft_full_gzip': ('/get-draft-data', {'Accept-Encoding': 'gzip'}),
+        'draft_not_modified': ('/get-draft-data', {'If-None-Match': draft_etag}),
+        'draft_filtered': ('/get-draft-data?season=2020&team=TEN', {}),
+        'draft_page': ('/get-draft-data?limit=100&columns=season,round,pick,pfr_player_name', {}),
+        'draft_ndjson': ('/get-draft-data?format=ndjson', {}),
+        'draft_aggregate': ('/get-draft-aggregates/car-av-by-position-college', {}),
+        'draft_aggregate_seasons': ('/get-draft-aggregates/picks-by-team-round?season=2010-2020', {}),
+        'roster_full': ('/get-roster-data', {}),
+        'roster_filtered': ('/get-roster-data?position=QB', {}),
+        'schedule_full': ('/get-schedule-data', {})
+    }
+
+    results = {}
+    for name, (path, headers) in cases.items():
+        client.get(path, headers=headers).get_data()  # Warm the cache and the index
+        samples = []
+        for _ in range(request_count):
+            start = time.perf_counter()
+            response = client.get(path, headers=headers)
+            response.get_data()
+            samples.append(time.perf_counter() - start)
+        results[name] = dict(latency_summary(samples), status=response.status_code)
+
+        # Cold: an empty response cache, so the blob is downloaded and serialized again
+        cold = []
+        for _ in range(cold_count):
+            server.blob_cache = BlobCache(ttl=server.blob_cache.ttl, max_bytes=server.blob_cache.max_bytes)
+            start = time.perf_counter()
+            client.get(path, headers=headers).get_data()
+            cold.append(time.perf_counter() - start)
+        if cold:
+            results[name]['cold'] = latency_summary(cold)
+        print(f"GET {name}: p50 {results[name]['p50_ms']} ms, p99 {results[name]['p99_ms']} ms")
+    return results
+
+
+def flatten(results, prefix=''):
+    values = {}
+    for key, value in results.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            values.update(flatten(value, f'{path}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+
+def compare(baseline, current, threshold):
+    # Positive change = worse; only throughput, latency, time and memory metrics are compared
+    old_values = flatten({k: v for k, v in baseline.items() if k != 'meta'})
+    new_values = flatten({k: v for k, v in current.items() if k != 'meta'})
+    regressions = []
+    for path, old in sorted(old_values.items()):
+        new = new_values.get(path)
+        if new is None or not old:
+            continue
+        if path.endswith('per_sec'):
+            change = (old - new) / old
+        elif path.endswith(('_ms', '_kb', 'seconds')):
+            change = (new - old) / old
+        else:
+            continue
+        flag = 'REGRESSION' if change > threshold else ''
+        if flag:
+            regressions.append(path)
+        print(f"{path:55} {old:>12.3f} {new:>12.3f} {-change if path.endswith('per_sec') else change:+8.1%} {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the ingest, load and serving paths')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='earlier results file to diff against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change counted as a regression')
+    parser.add_argument('--fixtures', help='recorded fixtures (python -m benchmarks.fixtures --record DIR)')
+    parser.add_argument('--format', default='json', choices=('json', 'ndjson', 'parquet'))
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+    parser.add_argument('--cold', type=int, default=5, help='cold-cache requests per endpoint')
+    parser.add_argument('--only', default=','.join(SUITES), help='comma-separated suites to run')
+    parser.add_argument('--refresh-child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.refresh_child:
+        refresh_child(args.refresh_child)
+        return
+
+    suites = [s.strip() for s in args.only.split(',') if s.strip()]
+    with tempfile.TemporaryDirectory() as work_dir:
+        fixtures_root = args.fixtures
+        if fixtures_root is None:
+            fixtures_root = os.path.join(work_dir, 'fixtures')
+            fixtures.generate(fixtures_root)
+        elif not fixtures.has_fixtures(fixtures_root):
+            sys.exit(f"No recorded fixtures in {fixtures_root}")
+
+        server, base_url = serve_fixtures(fixtures_root)
+        # Must be set before app and storage are imported
+        os.environ.update(bench_env(os.path.join(work_dir, 'storage'), base_url, args.format))
+
+        results = {
+            'meta': {
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'fixtures': 'recorded' if args.fixtures else 'synthetic',
+                'format': args.format
+            }
+        }
+        try:
+            if 'loaders' in suites or 'endpoints' in suites:
+                populate(fixtures_root)
+            if 'loaders' in suites:
+                results['loaders'] = bench_loaders(fixtures_root, args.format, work_dir)
+            if 'endpoints' in suites:
+                results['endpoints'] = bench_endpoints(args.requests, args.cold)
+            if 'refresh' in suites:
+                results['refresh'] = bench_refresh(base_url, args.format)
+        finally:
+            server.shutdown()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            sys.exit(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
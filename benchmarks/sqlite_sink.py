@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+import pipeline
+from bulk_load import DEFAULT_CHUNK_SIZE, chunked, delete_rows
+
+# SQLite stand-in for pipeline.SqlSink, so the loaders can be timed without Azure SQL.
+# It is swapped into a DatasetSpec and driven by pipeline.run() / run_partitioned(), so
+# the real read, shape and overlap code is what gets measured. It takes the same
+# write(conn, columns, rows, mode, chunk_size) call and reproduces the round-trip
+# pattern of each mode: 'row' issues one statement and one commit per row, 'bulk' stages
+# chunks with executemany and moves them with one set-based statement per chunk.
+# Partition replaces go through bulk_load.delete_rows (its [column] quoting is valid
+# SQLite). Absolute numbers are SQLite's; compare runs against each other, not against Azure.
+
+# Shaped schedule rows carry pandas Timestamps, which pyodbc takes as datetimes
+sqlite3.register_adapter(pd.Timestamp, lambda ts: ts.isoformat(sep=' '))
+
+
+def quote(column):
+    return f'"{column}"'
+
+
+@contextmanager
+def local_load_state():
+    # NFLLoadState is T-SQL; while loading into SQLite the versions are kept in a dict
+    versions = {}
+    saved = pipeline.get_loaded_version, pipeline.set_loaded_version
+    pipeline.get_loaded_version = lambda conn, dataset: versions.get(dataset)
+    pipeline.set_loaded_version = lambda conn, dataset, version: versions.__setitem__(dataset, version)
+    try:
+        yield versions
+    finally:
+        pipeline.get_loaded_version, pipeline.set_loaded_version = saved
+
+
+class SqliteSink:
+    def __init__(self, sink):
+        # Table, keys and upsert behaviour are taken from the real sink
+        self.sink = sink
+        self.table = sink.table
+        self.key_columns = sink.key_columns
+        self.label_column = sink.label_column
+        self.upsert = sink.upsert
+        self.scope_column = sink.scope_column
+        self.write_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def idempotent(self, mode):
+        return self.sink.idempotent(mode)
+
+    def clear(self, conn, filters):
+        return delete_rows(conn, self.table, filters)
+
+    def prepare(self, conn, mode):
+        pass
+
+    def create_table(self, conn, columns):
+        conn.execute(f"DROP TABLE IF EXISTS {self.table}")
+        conn.execute(f"CREATE TABLE {self.table} ({', '.join(quote(c) for c in columns)})")
+        if self.key_columns:
+            keys = ', '.join(quote(c) for c in self.key_columns)
+            conn.execute(f"CREATE UNIQUE INDEX ux_{self.table} ON {self.table} ({keys})")
+        conn.commit()
+
+    def upsert_clause(self, columns):
+        keys = ', '.join(quote(c) for c in self.key_columns)
+        updates = ', '.join(f"{quote(c)} = excluded.{quote(c)}" for c in columns if c not in self.key_columns)
+        return f"ON CONFLICT ({keys}) DO UPDATE SET {updates}"
+
+    def write(self, conn, columns, rows, mode, chunk_size=DEFAULT_CHUNK_SIZE):
+        if mode not in ('row', 'bulk'):
+            raise ValueError(f"SQLite stand-in does not support {mode} mode")
+        start = time.perf_counter()
+        try:
+            if mode == 'row':
+                return self.write_rows(conn, columns, rows)
+            return self.write_bulk(conn, columns, rows, chunk_size)
+        finally:
+            with self._lock:
+                self.write_seconds += time.perf_counter() - start
+
+    def write_rows(self, conn, columns, rows):
+        column_list = ', '.join(quote(c) for c in columns)
+        query = f"INSERT INTO {self.table} ({column_list}) VALUES ({', '.join('?' for _ in columns)})"
+        if self.upsert:
+            query += ' ' + self.upsert_clause(columns)
+        exists_query = None
+        if self.key_columns and not self.upsert:
+            exists_query = (
+                f"SELECT COUNT(*) FROM {self.table} WHERE {' AND '.join(f'{quote(c)} = ?' for c in self.key_columns)}"
+            )
+        key_indexes = [columns.index(c) for c in self.key_columns or []]
+
+        inserted = skipped = failed = 0
+        for row in rows:
+            try:
+                if exists_query:
+                    if conn.execute(exists_query, [row[i] for i in key_indexes]).fetchone()[0] > 0:
+                        skipped += 1
+                        continue
+                conn.execute(query, row)
+                conn.commit()
+                inserted += 1
+            except sqlite3.Error:
+                failed += 1
+        return {'inserted': inserted, 'skipped': skipped, 'failed': failed}
+
+    def write_bulk(self, conn, columns, rows, chunk_size):
+        column_list = ', '.join(quote(c) for c in columns)
+        staging_table = f'stage_{self.table}'
+        conn.execute(f"DROP TABLE IF EXISTS temp.{staging_table}")
+        conn.execute(f"CREATE TEMP TABLE {staging_table} ({column_list})")
+        stage_query = f"INSERT INTO {staging_table} ({column_list}) VALUES ({', '.join('?' for _ in columns)})"
+
+        move_query = f"INSERT INTO {self.table} ({column_list}) SELECT {column_list} FROM {staging_table}"
+        if self.upsert:
+            # WHERE true disambiguates the upsert clause from a join constraint
+            move_query += ' WHERE true ' + self.upsert_clause(columns)
+        elif self.key_columns:
+            key_filter = ' AND '.join(f"{quote(c)} IS NOT NULL" for c in self.key_columns)
+            move_query += f" WHERE {key_filter} ON CONFLICT DO NOTHING"
+
+        moved = 0
+        for chunk in chunked(rows, chunk_size):
+            conn.execute(f"DELETE FROM {staging_table}")
+            conn.executemany(stage_query, chunk)
+            moved += max(conn.execute(move_query).rowcount, 0)
+            conn.commit()
+        conn.execute(f"DROP TABLE temp.{staging_table}")
+
+        if self.upsert:
+            return {'merged': moved}
+        return {'inserted': moved, 'skipped': len(rows) - moved, 'failed': 0}
@@ -0,0 +1,136 @@
+import gzip
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# In-process read-through cache for the GET endpoints.
+# Entries are keyed by (container, blob) and hold the ready-to-send response body
+# together with the blob ETag it was built from. Entries younger than the TTL are
+# served without touching storage; older ones are revalidated against the blob ETag.
+# Compressed variants of the body are built once when an entry is stored.
+# With a shared store (see shared_cache.py) entries are written through to it and
+# bodies are memory-mapped views that all worker processes share.
+
+MIN_COMPRESS_SIZE = 1024
+SEND_CHUNK_SIZE = 256 * 1024
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def compress_stream(chunks, encoding):
+    # Compresses a body that is built while it is sent, e.g. an NDJSON stream
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        write, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+        write, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = write(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def response_body(body):
+    # Mapped bodies go out in slices, so a worker copies at most one chunk at a time
+    if isinstance(body, bytes):
+        return body
+    return (bytes(body[start:start + SEND_CHUNK_SIZE]) for start in range(0, len(body), SEND_CHUNK_SIZE))
+
+
+class CacheEntry:
+    def __init__(self, etag, body, variants=None):
+        self.etag = etag
+        self.body = body
+        if variants is None:
+            variants = {}
+            if len(body) >= MIN_COMPRESS_SIZE:
+                variants = {encoding: compress(body, encoding) for encoding in ENCODINGS}
+        self.variants = variants
+        self.size = len(body) + sum(len(v) for v in self.variants.values())
+        self.checked_at = time.monotonic()
+        self.index = None  # Query index, built on first filtered request
+
+    def is_fresh(self, ttl):
+        return time.monotonic() - self.checked_at < ttl
+
+    def touch(self):
+        self.checked_at = time.monotonic()
+
+
+class BlobCache:
+    def __init__(self, ttl=60, max_bytes=256 * 1024 * 1024, shared=None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, container_name, blob_name):
+        key = (container_name, blob_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        # Another worker may already have built this response
+        return self.adopt(container_name, blob_name)
+
+    def adopt(self, container_name, blob_name, etag=None):
+        # The shared version of a response, if there is one (for the given blob ETag)
+        if self.shared is None:
+            return None
+        entry = self.shared.get(container_name, blob_name, etag)
+        return self._insert((container_name, blob_name), entry) if entry is not None else None
+
+    def put(self, container_name, blob_name, etag, body):
+        entry = CacheEntry(etag, body)
+        if self.shared is not None:
+            try:
+                entry = self.shared.put(container_name, blob_name, entry)
+            except OSError as e:
+                print(f"Shared cache write failed for {blob_name}, keeping it in this worker: {e}")
+        return self._insert((container_name, blob_name), entry)
+
+    def _insert(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.size
+            if entry.size > self.max_bytes:
+                return entry  # Too large to keep, serve it once
+            self._entries[key] = entry
+            self.total_bytes += entry.size
+            # Evict least recently used entries until we are back under the size limit
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.size
+        return entry
+
+    def invalidate(self, container_name, blob_name):
+        with self._lock:
+            entry = self._entries.pop((container_name, blob_name), None)
+            if entry is not None:
+                self.total_bytes -= entry.size
+        if self.shared is not None:
+            self.shared.invalidate(container_name, blob_name)
+
+    def invalidate_prefix(self, container_name, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == container_name and k[1].startswith(prefix)]:
+                self.total_bytes -= self._entries.pop(key).size
+        if self.shared is not None:
+            self.shared.invalidate_prefix(container_name, prefix)
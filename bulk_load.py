@@ -0,0 +1,350 @@
+import hashlib
+import json
+import pyodbc
+
+from connections import is_transient
+
+# Set-based bulk loading shared by the blob2sql scripts.
+# Rows are sent to a session temp table in large batches with fast_executemany,
+# then copied into the target table with one INSERT ... SELECT per chunk, so a
+# full load costs a handful of round trips instead of one (or two) per row.
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def quote(column):
+    return f'[{column}]'
+
+
+def chunked(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def create_staging_table(cursor, table, columns):
+    staging_table = f'#stage_{table}'
+    column_list = ', '.join(quote(c) for c in columns)
+    cursor.execute(f"IF OBJECT_ID('tempdb..{staging_table}') IS NOT NULL DROP TABLE {staging_table}")
+    # Copy the column definitions of the target table without any rows
+    cursor.execute(f"SELECT TOP 0 {column_list} INTO {staging_table} FROM {table}")
+    return staging_table
+
+
+def build_move_query(table, staging_table, columns, key_columns):
+    column_list = ', '.join(quote(c) for c in columns)
+    if not key_columns:
+        return f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging_table}"
+
+    # Keep the first staged row per key and skip keys that already exist in the target
+    partition = ', '.join(quote(c) for c in key_columns)
+    key_filter = ' AND '.join(f"s.{quote(c)} IS NOT NULL" for c in key_columns)
+    key_match = ' AND '.join(f"t.{quote(c)} = s.{quote(c)}" for c in key_columns)
+    return f"""
+    INSERT INTO {table} ({column_list})
+    SELECT {column_list} FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY (SELECT 0)) AS rn
+        FROM {staging_table}
+    ) AS s
+    WHERE s.rn = 1 AND {key_filter}
+      AND NOT EXISTS (SELECT 1 FROM {table} AS t WHERE {key_match})
+    """
+
+
+def bulk_insert(conn, table, columns, rows, key_columns=None, label_column=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                failed_rows=None):
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+
+    staging_table = create_staging_table(cursor, table, columns)
+    conn.commit()  # Keep the temp table alive across chunk rollbacks
+
+    stage_query = (
+        f"INSERT INTO {staging_table} ({', '.join(quote(c) for c in columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    move_query = build_move_query(table, staging_table, columns, key_columns)
+    label_index = columns.index(label_column) if label_column else None
+
+    inserted = 0
+    failed = 0
+    for chunk in chunked(rows, chunk_size):
+        try:
+            cursor.execute(f"TRUNCATE TABLE {staging_table}")
+            cursor.executemany(stage_query, chunk)
+            cursor.execute(move_query)
+            inserted += max(cursor.rowcount, 0)
+            conn.commit()  # Commit once per chunk
+        except pyodbc.Error as e:
+            if is_transient(e):
+                raise  # The connection is gone; the caller retries the whole load
+            conn.rollback()
+            print(f"Chunk of {len(chunk)} rows failed ({e}), retrying row by row")
+            # Replay the chunk one row at a time so errors are reported per row
+            for row in chunk:
+                try:
+                    cursor.execute(f"TRUNCATE TABLE {staging_table}")
+                    cursor.execute(stage_query, row)
+                    cursor.execute(move_query)
+                    inserted += max(cursor.rowcount, 0)
+                    conn.commit()
+                except pyodbc.Error as row_error:
+                    if is_transient(row_error):
+                        raise
+                    conn.rollback()
+                    failed += 1
+                    if failed_rows is not None:
+                        failed_rows.append(row)
+                    label = row[label_index] if label_index is not None else 'Unknown'
+                    print(f"Error processing player {label}: {row_error}")
+
+    cursor.execute(f"DROP TABLE {staging_table}")
+    conn.commit()
+    cursor.close()
+
+    skipped = len(rows) - inserted - failed
+    return inserted, skipped, failed
+
+
+# Incremental sync: a side table keeps a content hash per key, so a refresh only
+# rewrites rows that are new or changed and marks entities that disappeared.
+
+def row_hash(row):
+    return hashlib.sha256(json.dumps(row, default=str).encode('utf-8')).hexdigest()
+
+
+def ensure_sync_table(cursor, sync_table, key_types):
+    key_definitions = ', '.join(f"{quote(c)} {t} NOT NULL" for c, t in key_types.items())
+    primary_key = ', '.join(quote(c) for c in key_types)
+    cursor.execute(f"""
+    IF OBJECT_ID('{sync_table}') IS NULL
+    CREATE TABLE {sync_table} (
+        {key_definitions},
+        row_hash CHAR(64) NOT NULL,
+        active BIT NOT NULL DEFAULT 1,
+        updated_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+        PRIMARY KEY ({primary_key})
+    )
+    """)
+
+
+def sync_rows(conn, table, columns, rows, key_types, entity_column, scope_column,
+              label_column=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    key_columns = list(key_types)
+    sync_table = f'{table}Sync'
+    key_indexes = [columns.index(c) for c in key_columns]
+    entity_index = columns.index(entity_column)
+    scope_index = columns.index(scope_column)
+
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+    ensure_sync_table(cursor, sync_table, key_types)
+    conn.commit()
+
+    # Last occurrence of a key in the file wins; rows with an incomplete key cannot be tracked
+    incoming = {}
+    for row in rows:
+        key = tuple(row[i] for i in key_indexes)
+        if None in key:
+            print(f"Skipping player {row[entity_index]}: incomplete sync key {key}")
+            continue
+        incoming[key] = row
+    scopes = sorted({row[scope_index] for row in incoming.values()})
+    if not scopes:
+        cursor.close()
+        return {'new': 0, 'changed': 0, 'reactivated': 0, 'dropped': 0, 'failed': 0}
+
+    # One round trip for the stored hashes of every season in the file
+    scope_params = ', '.join('?' for _ in scopes)
+    cursor.execute(
+        f"SELECT {', '.join(quote(c) for c in key_columns)}, row_hash, active FROM {sync_table} "
+        f"WHERE {quote(scope_column)} IN ({scope_params})",
+        scopes
+    )
+    existing = {tuple(r[:len(key_columns)]): (r[-2], bool(r[-1])) for r in cursor.fetchall()}
+
+    changed_rows = []
+    sync_updates = []
+    counts = {'new': 0, 'changed': 0, 'reactivated': 0}
+    for key, row in incoming.items():
+        digest = row_hash(row)
+        stored = existing.get(key)
+        if stored is None:
+            counts['new'] += 1
+            changed_rows.append(row)
+        elif stored[0] != digest:
+            counts['changed'] += 1
+            changed_rows.append(row)
+        elif not stored[1]:
+            counts['reactivated'] += 1
+        else:
+            continue
+        sync_updates.append(key + (digest,))
+
+    present = {(row[scope_index], row[entity_index]) for row in incoming.values()}
+    scope_position = key_columns.index(scope_column)
+    entity_position = key_columns.index(entity_column)
+    dropped = sorted({
+        (key[scope_position], key[entity_position])
+        for key, (_, active) in existing.items()
+        if active and (key[scope_position], key[entity_position]) not in present
+    })
+
+    failed_rows = []
+    if changed_rows:
+        # Remove the previous version of changed keys, then insert the new rows in bulk
+        key_staging = f'#keys_{table}'
+        key_list = ', '.join(quote(c) for c in key_columns)
+        cursor.execute(f"IF OBJECT_ID('tempdb..{key_staging}') IS NOT NULL DROP TABLE {key_staging}")
+        cursor.execute(f"SELECT TOP 0 {key_list} INTO {key_staging} FROM {sync_table}")
+        cursor.executemany(
+            f"INSERT INTO {key_staging} ({key_list}) VALUES ({', '.join('?' for _ in key_columns)})",
+            [tuple(row[i] for i in key_indexes) for row in changed_rows]
+        )
+        key_match = ' AND '.join(f"t.{quote(c)} = k.{quote(c)}" for c in key_columns)
+        cursor.execute(f"DELETE t FROM {table} AS t JOIN {key_staging} AS k ON {key_match}")
+        cursor.execute(f"DROP TABLE {key_staging}")
+        conn.commit()
+        bulk_insert(conn, table, columns, changed_rows, label_column=label_column, chunk_size=chunk_size,
+                    failed_rows=failed_rows)
+        # Rows that failed to insert keep their old hash so the next run retries them
+        failed_keys = {tuple(row[i] for i in key_indexes) for row in failed_rows}
+        sync_updates = [u for u in sync_updates if u[:-1] not in failed_keys]
+
+    if sync_updates:
+        hash_staging = f'#hashes_{table}'
+        hash_columns = key_columns + ['row_hash']
+        hash_list = ', '.join(quote(c) for c in hash_columns)
+        key_match = ' AND '.join(f"t.{quote(c)} = s.{quote(c)}" for c in key_columns)
+        cursor.execute(f"IF OBJECT_ID('tempdb..{hash_staging}') IS NOT NULL DROP TABLE {hash_staging}")
+        cursor.execute(f"SELECT TOP 0 {hash_list} INTO {hash_staging} FROM {sync_table}")
+        cursor.executemany(
+            f"INSERT INTO {hash_staging} ({hash_list}) VALUES ({', '.join('?' for _ in hash_columns)})",
+            sync_updates
+        )
+        cursor.execute(f"""
+        MERGE {sync_table} AS t
+        USING {hash_staging} AS s
+        ON ({key_match})
+        WHEN MATCHED THEN
+            UPDATE SET row_hash = s.row_hash, active = 1, updated_at = SYSUTCDATETIME()
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT ({hash_list}, active) VALUES ({', '.join(f's.{quote(c)}' for c in hash_columns)}, 1);
+        """)
+        cursor.execute(f"DROP TABLE {hash_staging}")
+        conn.commit()
+
+    if dropped:
+        # Players that are no longer on the season's roster keep their rows but are marked inactive
+        cursor.executemany(
+            f"UPDATE {sync_table} SET active = 0, updated_at = SYSUTCDATETIME() "
+            f"WHERE {quote(scope_column)} = ? AND {quote(entity_column)} = ? AND active = 1",
+            dropped
+        )
+        conn.commit()
+
+    cursor.close()
+    counts['dropped'] = len(dropped)
+    counts['failed'] = len(failed_rows)
+    return counts
+
+
+def delete_rows(conn, table, filters):
+    # filters: column -> values, all of which must match; None matches NULL
+    clauses = []
+    params = []
+    for column, values in filters.items():
+        present = [v for v in values if v is not None]
+        matches = []
+        if present:
+            matches.append(f"{quote(column)} IN ({', '.join('?' for _ in present)})")
+            params += present
+        if len(present) < len(values):
+            matches.append(f"{quote(column)} IS NULL")
+        clauses.append(f"({' OR '.join(matches)})")
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {table} WHERE {' AND '.join(clauses)}", params)
+    deleted = max(cursor.rowcount, 0)
+    conn.commit()
+    cursor.close()
+    return deleted
+
+
+def bulk_merge(conn, table, columns, rows, key_columns):
+    # Upsert every row with a single MERGE from a staged copy of the batch
+    if not rows:
+        return 0  # executemany rejects an empty batch, e.g. when every feed failed
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+    staging_table = create_staging_table(cursor, table, columns)
+    cursor.executemany(
+        f"INSERT INTO {staging_table} ({', '.join(quote(c) for c in columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})",
+        rows
+    )
+    key_match = ' AND '.join(f"target.{quote(c)} = source.{quote(c)}" for c in key_columns)
+    updates = ', '.join(f"{quote(c)} = source.{quote(c)}" for c in columns if c not in key_columns)
+    cursor.execute(f"""
+    MERGE {table} AS target
+    USING {staging_table} AS source
+    ON ({key_match})
+    WHEN MATCHED THEN
+        UPDATE SET {updates}
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT ({', '.join(quote(c) for c in columns)})
+        VALUES ({', '.join(f'source.{quote(c)}' for c in columns)});
+    """)
+    merged = max(cursor.rowcount, 0)
+    cursor.execute(f"DROP TABLE {staging_table}")
+    conn.commit()
+    cursor.close()
+    return merged
+
+
+def build_row_merge_query(table, columns, key_columns):
+    key_match = ' AND '.join(f"target.{quote(c)} = source.{quote(c)}" for c in key_columns)
+    updates = ', '.join(f"{quote(c)} = source.{quote(c)}" for c in columns if c not in key_columns)
+    return f"""
+    MERGE {table} AS target
+    USING (SELECT {', '.join(f'? AS {quote(c)}' for c in columns)}) AS source
+    ON ({key_match})
+    WHEN MATCHED THEN
+        UPDATE SET {updates}
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT ({', '.join(quote(c) for c in columns)})
+        VALUES ({', '.join(f'source.{quote(c)}' for c in columns)});
+    """
+
+
+def row_insert(conn, table, columns, rows, key_columns=None, label_column=None, upsert=False):
+    # One statement and one commit per row; kept for comparison with the set-based paths
+    cursor = conn.cursor()
+    if upsert:
+        query = build_row_merge_query(table, columns, key_columns)
+    else:
+        query = f"INSERT INTO {table} ({', '.join(quote(c) for c in columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    exists_query = None
+    if key_columns and not upsert:
+        exists_query = f"SELECT COUNT(*) FROM {table} WHERE {' AND '.join(f'{quote(c)} = ?' for c in key_columns)}"
+    key_indexes = [columns.index(c) for c in key_columns or []]
+    label_index = columns.index(label_column) if label_column else None
+
+    inserted = skipped = failed = 0
+    for row in rows:
+        try:
+            if exists_query:
+                # Check if the record already exists
+                cursor.execute(exists_query, [row[i] for i in key_indexes])
+                if cursor.fetchone()[0] > 0:
+                    skipped += 1
+                    continue
+            cursor.execute(query, row)
+            conn.commit()  # Commit each insert
+            inserted += 1
+        except pyodbc.Error as e:
+            if is_transient(e):
+                raise
+            failed += 1
+            label = row[label_index] if label_index is not None else 'Unknown'
+            print(f"Error processing player {label}: {e}")
+    cursor.close()
+    return inserted, skipped, failed
@@ -0,0 +1,140 @@
+import io
+import json
+
+from metrics import timed
+from storage import NotFoundError
+
+# Optional columnar layout for the nflverse datasets (STORAGE_FORMAT=parquet).
+# Instead of one JSON document, a dataset is stored as one compressed Parquet file per
+# season under a prefix, plus a small manifest listing the partitions and columns:
+#
+#   draft_picks/manifest.json
+#   draft_picks/season=1980.parquet
+#   ...
+#
+# Readers load the manifest and then fetch only the seasons and columns they need.
+# pyarrow is only required when the layout is enabled.
+
+MANIFEST_NAME = 'manifest.json'
+PARTITION_COLUMN = 'season'
+# Accepted season years; the first NFL season is 1920
+MIN_SEASON = 1920
+MAX_SEASON = 2100
+
+
+def manifest_blob(prefix):
+    return f'{prefix}/{MANIFEST_NAME}'
+
+
+def partition_blob(prefix, season):
+    return f'{prefix}/{PARTITION_COLUMN}={season}.parquet'
+
+
+def encode_parquet(table, compression='zstd'):
+    import pyarrow.parquet as pq
+
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression=compression)
+    return buffer.getvalue()
+
+
+def write_partitions(storage, container_name, prefix, df, compression='zstd', source=None):
+    import pyarrow as pa
+
+    partitions = []
+    for season, part in df.groupby(PARTITION_COLUMN, sort=True):
+        season = int(season)
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        blob_name = partition_blob(prefix, season)
+        storage.upload(container_name, blob_name, encode_parquet(table, compression), overwrite=True)
+        partitions.append({'season': season, 'blob': blob_name, 'rows': len(part)})
+
+    # The manifest is written last so readers never see a partially written version
+    manifest = {
+        'format': 'parquet',
+        'partition_column': PARTITION_COLUMN,
+        'columns': list(df.columns),
+        'rows': len(df),
+        'partitions': partitions,
+        'source': source or {}
+    }
+    storage.upload(container_name, manifest_blob(prefix), json.dumps(manifest), overwrite=True)
+    return manifest
+
+
+def update_manifest(storage, container_name, prefix, partitions, columns):
+    # Replace the listed season partitions in the manifest, keeping the others
+    try:
+        manifest, _ = read_manifest(storage, container_name, prefix)
+    except NotFoundError:
+        manifest = {'format': 'parquet', 'partition_column': PARTITION_COLUMN, 'columns': [], 'partitions': []}
+    replaced = {p['season'] for p in partitions}
+    manifest['partitions'] = sorted(
+        [p for p in manifest['partitions'] if p['season'] not in replaced] + partitions,
+        key=lambda p: p['season']
+    )
+    manifest['columns'] = manifest['columns'] + [c for c in columns if c not in manifest['columns']]
+    manifest['rows'] = sum(p['rows'] for p in manifest['partitions'])
+    storage.upload(container_name, manifest_blob(prefix), json.dumps(manifest), overwrite=True)
+    return manifest
+
+
+def read_manifest(storage, container_name, prefix):
+    data, props = storage.download(container_name, manifest_blob(prefix))
+    return json.loads(data), props
+
+
+def read_table(storage, container_name, manifest, seasons=None, columns=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if columns is not None:
+        columns = [c for c in manifest['columns'] if c in set(columns)]
+    partitions = manifest['partitions']
+    if seasons is not None:
+        partitions = [p for p in partitions if p['season'] in seasons]
+
+    tables = []
+    for partition in partitions:
+        with timed('fetch', container_name) as stage:
+            data, _ = storage.download(container_name, partition['blob'])
+            stage.bytes = len(data)
+        with timed('parse', container_name, nbytes=len(data)) as stage:
+            tables.append(pq.read_table(pa.BufferReader(data), columns=columns))
+            stage.rows = tables[-1].num_rows
+    if not tables:
+        return None
+    return pa.concat_tables(tables, promote_options='default')
+
+
+def read_records(storage, container_name, manifest, seasons=None, columns=None):
+    table = read_table(storage, container_name, manifest, seasons=seasons, columns=columns)
+    if table is None:
+        return []
+    with timed('transform', container_name, rows=table.num_rows):
+        return table.to_pylist()
+
+
+def check_season(season):
+    if not MIN_SEASON <= season <= MAX_SEASON:
+        raise ValueError(f"Season {season} is outside {MIN_SEASON}-{MAX_SEASON}")
+    return season
+
+
+def parse_seasons(value):
+    # "2020,2022-2024" -> {2020, 2022, 2023, 2024}; raises ValueError for anything else.
+    # Years are checked before a range is expanded, since the value may come from a query string
+    seasons = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            start, end = check_season(int(start)), check_season(int(end))
+            if start > end:
+                raise ValueError(f"Season range {part} is reversed")
+            seasons.update(range(start, end + 1))
+        else:
+            seasons.add(check_season(int(part)))
+    return seasons
@@ -0,0 +1,92 @@
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import pyodbc
+
+# SQL connections for the loaders. connect() opens one from the AZURE_SQL_* settings.
+# A ConnectionPool hands each worker thread its own pyodbc connection (connections are
+# not shared between threads) and reuses them across partitions. retry() reruns a unit
+# of work on transient Azure SQL errors with exponential backoff; any other error is
+# raised straight away.
+
+# Connection-level SQLSTATEs: link failure, connection timeout, serialization failure
+TRANSIENT_SQLSTATES = {'08S01', '08001', '08004', 'HYT00', 'HYT01', '40001'}
+
+# Native error numbers Azure SQL returns while a database is moving, throttled or failing over
+TRANSIENT_ERRORS = {1205, 4060, 4221, 10053, 10054, 10060, 10928, 10929, 40143, 40197, 40501, 40540, 40613,
+                    49918, 49919, 49920}
+
+
+def connection_string():
+    # Azure SQL Database credentials from environment variables
+    return (
+        f'DRIVER={{ODBC Driver 17 for SQL Server}};'
+        f"SERVER={os.getenv('AZURE_SQL_SERVER')};"
+        f"DATABASE={os.getenv('AZURE_SQL_DATABASE')};"
+        f"UID={os.getenv('AZURE_SQL_USERNAME')};"
+        f"PWD={os.getenv('AZURE_SQL_PASSWORD')}"
+    )
+
+
+def connect():
+    return pyodbc.connect(connection_string())
+
+
+def is_transient(error):
+    if not isinstance(error, pyodbc.Error) or not error.args:
+        return False
+    if error.args[0] in TRANSIENT_SQLSTATES:
+        return True
+    # The native error number appears in the driver message as "(40613)"
+    message = str(error.args[-1])
+    return any(f'({code})' in message for code in TRANSIENT_ERRORS)
+
+
+class ConnectionPool:
+    def __init__(self, connect, size=4):
+        self.connect = connect
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        # At most `size` connections are checked out at once; a connection that raised is closed, not reused
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self.connect()
+            try:
+                yield conn
+            except Exception:
+                try:
+                    conn.close()
+                except pyodbc.Error:
+                    pass
+                raise
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def retry(fn, attempts=4, base_delay=1.0, max_delay=30.0, label='operation'):
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except pyodbc.Error as e:
+            if attempt == attempts or not is_transient(e):
+                raise
+            # Full backoff doubles per attempt; jitter keeps parallel partitions from retrying in lockstep
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            print(f"Transient SQL error on {label} ({e}), retry {attempt}/{attempts - 1} in {delay:.1f}s")
+            time.sleep(delay)
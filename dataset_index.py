@@ -0,0 +1,103 @@
+import json
+import threading
+from columnar import parse_seasons
+
+# In-memory indexes for server-side filtering of the draft and roster datasets.
+# An index is built once per dataset version (blob ETag) and maps each value of the
+# indexed fields to the positions of the matching records, so a filtered request
+# only touches the rows it returns.
+
+INDEXED_FIELDS = ('season', 'team', 'round', 'position', 'gsis_id')
+PAGING_PARAMS = ('columns', 'limit', 'cursor')
+MAX_LIMIT = 10000
+
+
+def normalize(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip().lower()
+
+
+class DatasetIndex:
+    def __init__(self, records, indexed_fields=INDEXED_FIELDS):
+        self.records = records
+        self.columns = list(records[0].keys()) if records else []
+        self.indexes = {field: {} for field in indexed_fields}
+        for position, record in enumerate(records):
+            for field, index in self.indexes.items():
+                value = record.get(field)
+                if value is not None:
+                    index.setdefault(normalize(value), []).append(position)
+
+    def query(self, filters, columns=None, cursor=0, limit=None):
+        positions = None
+        # Intersect the smallest posting lists first
+        candidates = []
+        for field, values in filters.items():
+            index = self.indexes[field]
+            matched = set()
+            for value in values:
+                matched.update(index.get(normalize(value), ()))
+            candidates.append(matched)
+        for matched in sorted(candidates, key=len):
+            positions = matched if positions is None else positions & matched
+            if not positions:
+                break
+        positions = range(len(self.records)) if positions is None else sorted(positions)
+
+        total = len(positions)
+        end = total if limit is None else min(cursor + limit, total)
+        page = [self.records[p] for p in positions[cursor:end]]
+        if columns:
+            page = [{c: record.get(c) for c in columns} for record in page]
+        next_cursor = str(end) if end < total else None
+        return {'data': page, 'total': total, 'next_cursor': next_cursor}
+
+
+def has_query(args):
+    return any(name in args for name in INDEXED_FIELDS + PAGING_PARAMS)
+
+
+def parse_query(args, index):
+    # Raises ValueError with a client-facing message for invalid parameters
+    filters = {}
+    for field in INDEXED_FIELDS:
+        if field in args:
+            if field == 'season':
+                try:
+                    values = [str(s) for s in sorted(parse_seasons(args.get(field)))]
+                except ValueError:
+                    raise ValueError("season must be a list of years or year ranges, e.g. 2020,2022-2024")
+            else:
+                values = [v for v in args.get(field).split(',') if v.strip()]
+            if values:
+                filters[field] = values
+
+    columns = None
+    if args.get('columns'):
+        columns = [c.strip() for c in args.get('columns').split(',') if c.strip()]
+        unknown = [c for c in columns if c not in index.columns]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    try:
+        cursor = int(args.get('cursor', 0))
+        limit = int(args['limit']) if 'limit' in args else None
+    except ValueError:
+        raise ValueError("cursor and limit must be integers")
+    if cursor < 0 or (limit is not None and not 0 < limit <= MAX_LIMIT):
+        raise ValueError(f"cursor must be >= 0 and limit between 1 and {MAX_LIMIT}")
+
+    return filters, columns, cursor, limit
+
+
+_build_lock = threading.Lock()
+
+
+def get_index(entry):
+    # Built lazily from the cached response body and kept on the cache entry
+    if entry.index is None:
+        with _build_lock:
+            if entry.index is None:
+                entry.index = DatasetIndex(json.loads(bytes(entry.body)))
+    return entry.index
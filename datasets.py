@@ -0,0 +1,81 @@
+import os
+
+import espn
+from columnar import parse_seasons
+from metrics import timed
+from pipeline import BlobSource, DatasetSpec, RecordSource, SqlSink
+
+# Dataset specs for the SQL loads. Adding a dataset means adding a spec here and a
+# one-line script that calls pipeline.main() with it.
+
+DRAFT_COLUMNS = [
+    'season', 'round', 'pick', 'team', 'gsis_id', 'pfr_player_id', 'cfb_player_id', 'pfr_player_name',
+    'hof', 'position', 'category', 'side', 'college', 'age', 'to', 'allpro',
+    'probowls', 'seasons_started', 'w_av', 'car_av', 'dr_av', 'games', 'pass_completions', 'pass_attempts',
+    'pass_yards', 'pass_tds', 'pass_ints', 'rush_atts', 'rush_yards', 'rush_tds', 'receptions', 'rec_yards',
+    'rec_tds', 'def_solo_tackles', 'def_ints', 'def_sacks'
+]
+
+ROSTER_COLUMNS = [
+    'birth_date', 'college', 'depth_chart_position', 'draft_club', 'draft_number', 'entry_year', 'esb_id', 'espn_id',
+    'fantasy_data_id', 'first_name', 'football_name', 'full_name', 'game_type', 'gsis_id', 'gsis_it_id', 'headshot_url',
+    'height', 'jersey_number', 'last_name', 'ngs_position', 'pff_id', 'pfr_id', 'position', 'rookie_year',
+    'rotowire_id', 'season', 'sleeper_id', 'smart_id', 'sportradar_id', 'status', 'status_description_abbr', 'team',
+    'week', 'weight', 'yahoo_id', 'years_exp'
+]
+
+DRAFT = DatasetSpec(
+    name='draft',
+    source=BlobSource('nfl-draft-data', 'draft_picks_1980-2024', partition_prefix='draft_picks'),
+    columns=DRAFT_COLUMNS,
+    required=['pfr_player_id'],
+    partitions={'season': 'season', 'team': 'team'},
+    # Existing players are skipped
+    sink=SqlSink('NFLDraft', key_columns=['pfr_player_id'], label_column='pfr_player_id')
+)
+
+def latest_roster_season():
+    # Loaded when no seasons are given: the last of ROSTER_SEASONS, the season app.py serves
+    return {max(parse_seasons(os.getenv('ROSTER_SEASONS', '2024')))}
+
+
+ROSTER = DatasetSpec(
+    name='roster',
+    source=BlobSource('nfl-roster-data', 'roster_{season}', partition_prefix='roster', default_seasons=latest_roster_season),
+    columns=ROSTER_COLUMNS,
+    required=['gsis_id'],
+    partitions={'season': 'season', 'team': 'team'},
+    sink=SqlSink(
+        'NFLRoster', label_column='gsis_id',
+        sync_key_types={'gsis_id': 'NVARCHAR(32)', 'season': 'INT', 'week': 'INT'}, entity_column='gsis_id'
+    )
+)
+
+
+def schedule_spec(mode='team', season_types=espn.SEASON_TYPES, workers=16, season=None):
+    # 'team' reads the TEN feed, 'league' every team's feeds for one season (None = current) fetched concurrently
+    if mode == 'league':
+        def fetch():
+            # A backfill of a past season must not record a partial schedule as loaded
+            events = espn.fetch_league_schedule(season_types, workers, season=season, strict=season is not None)
+            with timed('transform', 'espn', rows=len(events)):
+                df, _ = espn.normalize_schedule(events)
+            return df.sort_values('EventId', ignore_index=True)
+        types = ','.join(map(str, season_types))
+        name = f"league:{types}" if season is None else f"league:{season}:{types}"
+    else:
+        def fetch():
+            events = espn.fetch_team_url()
+            with timed('transform', 'espn', rows=len(events)):
+                df, _ = espn.normalize_schedule(events)
+            return df
+        name = espn.TEAM_URL
+
+    return DatasetSpec(
+        name='schedule',
+        source=RecordSource(name, fetch),
+        columns=espn.SCHEDULE_COLUMNS,
+        required=['EventId'],
+        partitions={'season': 'SeasonYear', 'team': 'HomeTeamAbbreviation'},
+        sink=SqlSink('NFLSchedule', key_columns=['EventId'], label_column='EventId', upsert=True)
+    )
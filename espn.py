@@ -0,0 +1,201 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+from metrics import timed
+
+# ESPN schedule feeds: fetching team schedules and flattening events into NFLSchedule rows.
+# normalize_schedule() turns a whole list of events into an NFLSchedule-shaped DataFrame
+# at once: the payload is flattened with json_normalize, home/away competitors are split
+# from one exploded frame, dates are parsed as a column, and the result is checked
+# against SCHEDULE_SCHEMA before it reaches SQL.
+
+TEAM_URL = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/teams/TEN/schedule?seasontype=2'
+TEAM_SCHEDULE_URL = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/teams/{team}/schedule'
+SEASON_TYPES = (1, 2, 3)  # preseason, regular season, postseason
+
+NFL_TEAMS = [
+    'ARI', 'ATL', 'BAL', 'BUF', 'CAR', 'CHI', 'CIN', 'CLE', 'DAL', 'DEN', 'DET', 'GB', 'HOU', 'IND', 'JAX', 'KC',
+    'LV', 'LAC', 'LAR', 'MIA', 'MIN', 'NE', 'NO', 'NYG', 'NYJ', 'PHI', 'PIT', 'SF', 'SEA', 'TB', 'TEN', 'WSH'
+]
+
+SCHEDULE_COLUMNS = [
+    'EventId', 'EventDate', 'EventName', 'ShortName', 'SeasonYear', 'SeasonDisplayName', 'SeasonType', 'WeekNumber',
+    'WeekText', 'HomeTeamId', 'HomeTeamLocation', 'HomeTeamNickname', 'HomeTeamAbbreviation', 'HomeTeamDisplayName',
+    'HomeTeamShortDisplayName', 'AwayTeamId', 'AwayTeamLocation', 'AwayTeamNickname', 'AwayTeamAbbreviation',
+    'AwayTeamDisplayName', 'AwayTeamShortDisplayName', 'Venue', 'City', 'State', 'ZipCode', 'GameTime',
+    'BroadcastChannel', 'HomeTeamLogo', 'HomeTeamLogoParams', 'AwayTeamLogo', 'AwayTeamLogoParams'
+]
+
+# NFLSchedule column types; columns listed in SCHEDULE_REQUIRED are NOT NULL
+SCHEDULE_SCHEMA = dict(
+    {column: 'str' for column in SCHEDULE_COLUMNS},
+    EventDate='datetime', SeasonYear='int', WeekNumber='int'
+)
+SCHEDULE_REQUIRED = ['EventId', 'EventDate', 'SeasonYear', 'HomeTeamId', 'AwayTeamId']
+
+TEAM_FIELDS = {
+    'TeamId': 'team.id',
+    'TeamLocation': 'team.location',
+    'TeamNickname': 'team.nickname',
+    'TeamAbbreviation': 'team.abbreviation',
+    'TeamDisplayName': 'team.displayName',
+    'TeamShortDisplayName': 'team.shortDisplayName'
+}
+
+
+def fetch_team_schedule(session, team, season_type, season=None):
+    # season=None is the current season
+    params = {'seasontype': season_type}
+    if season is not None:
+        params['season'] = season
+    with timed('fetch', 'espn') as stage:
+        response = session.get(TEAM_SCHEDULE_URL.format(team=team), params=params, timeout=30)
+        response.raise_for_status()
+        stage.bytes = len(response.content)
+    with timed('parse', 'espn', nbytes=len(response.content)) as stage:
+        events = response.json().get('events', [])
+        stage.rows = len(events)
+    return events
+
+
+def fetch_league_schedule(season_types=SEASON_TYPES, workers=16, season=None, strict=False):
+    # strict=True fails on the first feed that cannot be fetched instead of loading a partial schedule
+    # One pooled session shared by all worker threads
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('https://', adapter)
+
+    jobs = [(team, season_type) for team in NFL_TEAMS for season_type in season_types]
+    events = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_team_schedule, session, team, st, season): (team, st) for team, st in jobs}
+        for future, (team, season_type) in futures.items():
+            try:
+                team_events = future.result()
+            except requests.exceptions.RequestException as e:
+                if strict:
+                    session.close()
+                    raise
+                print(f"Error fetching {team} schedule (seasontype={season_type}): {e}")
+                continue
+            # Each game appears in both teams' feeds; keep one copy per EventId
+            for event in team_events:
+                events[event.get('id')] = event
+    session.close()
+    return list(events.values())
+
+
+def fetch_team_url(url=TEAM_URL):
+    with timed('fetch', 'espn') as stage:
+        response = requests.get(url)
+        response.raise_for_status()
+        stage.bytes = len(response.content)
+    with timed('parse', 'espn', nbytes=len(response.content)) as stage:
+        events = response.json().get('events', [])
+        stage.rows = len(events)
+    return events
+
+
+def column(df, name):
+    # json_normalize leaves out keys that no event has
+    return df[name] if name in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+
+def first(series):
+    # First element of each list, NaN for empty or missing lists
+    return series.astype(object).str[0].astype(object)
+
+
+def split_competitors(competitions, event_ids):
+    # One exploded frame with a row per competitor, then one home and one away frame keyed by EventId
+    competitors = pd.DataFrame({'EventId': event_ids.values, 'competitor': column(competitions, 'competitors').values})
+    competitors = competitors.explode('competitor').dropna(subset=['competitor'])
+    flat = pd.json_normalize(competitors['competitor'].tolist())
+    flat['EventId'] = competitors['EventId'].values
+    logos = first(column(flat, 'team.logos'))
+    flat['TeamLogo'] = logos.str.get('href')
+    flat['TeamLogoParams'] = logos.map(json.dumps, na_action='ignore')
+
+    sides = {}
+    for side in ('home', 'away'):
+        part = flat[column(flat, 'homeAway') == side].drop_duplicates('EventId').set_index('EventId')
+        part = part.reindex(event_ids.values)
+        prefix = side.capitalize()
+        fields = dict(TEAM_FIELDS, TeamLogo='TeamLogo', TeamLogoParams='TeamLogoParams')
+        sides[side] = pd.DataFrame(
+            {f'{prefix}{name}': column(part, field).values for name, field in fields.items()}, index=event_ids.index
+        )
+    return sides['home'], sides['away']
+
+
+def validate_schedule(df):
+    # Coerce columns to the SCHEDULE_SCHEMA types; rows that do not fit are dropped and reported
+    df = df.copy()
+    invalid = pd.Series(False, index=df.index)
+    reasons = pd.Series('', index=df.index)
+    for name, kind in SCHEDULE_SCHEMA.items():
+        values = df[name]
+        if kind == 'int':
+            coerced = pd.to_numeric(values, errors='coerce').astype('Int64')
+        elif kind == 'datetime':
+            coerced = values
+        else:
+            coerced = values.where(values.isna(), values.astype(str))
+        bad = coerced.isna() & values.notna()
+        if name in SCHEDULE_REQUIRED:
+            bad |= coerced.isna()
+        invalid |= bad
+        reasons = reasons.where(~bad, reasons + f'{name} ')
+        df[name] = coerced
+
+    errors = [(event_id, f"invalid {reason.strip().replace(' ', ', ')}")
+              for event_id, reason in zip(df.loc[invalid, 'EventId'], reasons[invalid])]
+    return df[~invalid].reset_index(drop=True), errors
+
+
+def normalize_schedule(events):
+    # Returns (DataFrame with SCHEDULE_COLUMNS, [(event_id, error)] for events that failed validation)
+    if not events:
+        return pd.DataFrame(columns=SCHEDULE_COLUMNS), []
+
+    base = pd.json_normalize(events)
+    competitions = pd.json_normalize(
+        first(column(base, 'competitions')).map(lambda c: c if isinstance(c, dict) else {}).tolist()
+    )
+    competitions.index = base.index
+    event_ids = column(base, 'id')
+    dates = column(base, 'date')
+    home, away = split_competitors(competitions, event_ids)
+    broadcast = first(column(competitions, 'broadcasts')).str.get('media').str.get('shortName')
+
+    df = pd.concat([
+        pd.DataFrame({
+            'EventId': event_ids,
+            'EventDate': pd.to_datetime(dates, format='%Y-%m-%dT%H:%MZ', errors='coerce'),
+            'EventName': column(base, 'name'),
+            'ShortName': column(base, 'shortName'),
+            'SeasonYear': column(base, 'season.year'),
+            'SeasonDisplayName': column(base, 'season.displayName'),
+            'SeasonType': column(base, 'seasonType.name'),
+            'WeekNumber': column(base, 'week.number'),
+            'WeekText': column(base, 'week.text'),
+        }),
+        home,
+        away,
+        pd.DataFrame({
+            'Venue': column(competitions, 'venue.fullName'),
+            'City': column(competitions, 'venue.address.city'),
+            'State': column(competitions, 'venue.address.state'),
+            'ZipCode': column(competitions, 'venue.address.zipCode'),
+            'GameTime': dates.str.extract(r'T([^Z]*)Z', expand=False),
+            'BroadcastChannel': broadcast.fillna('N/A'),
+        })
+    ], axis=1)[SCHEDULE_COLUMNS]
+
+    df, errors = validate_schedule(df)
+    for event_id, error in errors:
+        print(f"Error parsing event {event_id if isinstance(event_id, str) else 'Unknown'}: {error}")
+    return df, errors
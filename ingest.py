@@ -0,0 +1,230 @@
+import hashlib
+import io
+import json
+
+import pandas as pd
+import requests
+
+from metrics import timed, timed_iter
+from storage import DEFAULT_CHUNK_SIZE, NotFoundError, new_block_id
+
+# Streaming CSV -> blob ingest for the fetch-and-upload endpoints.
+# The source CSV is read from the HTTP response in chunks of rows, each chunk is encoded
+# straight to the target format and appended to a BlockWriter, which uploads full blocks
+# as they fill up and commits the block list at the end. Peak memory is one chunk of rows
+# plus one block, whatever the size of the source file.
+#
+# Refreshes are conditional: the upstream ETag / Last-Modified and a SHA-256 of the encoded
+# content are kept in the blob metadata. A 304 from upstream, or a download that hashes to
+# the stored value, skips the upload entirely.
+
+DEFAULT_CHUNK_ROWS = 20000
+FORMATS = ('json', 'ndjson', 'parquet')
+
+
+class BlockWriter(io.RawIOBase):
+    def __init__(self, storage, container_name, blob_name, block_size=DEFAULT_CHUNK_SIZE):
+        self.storage = storage
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.block_size = block_size
+        self.block_ids = []
+        self.buffer = bytearray()
+        self.position = 0
+        self.sha256 = hashlib.sha256()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.buffer += data
+        self.position += len(data)
+        self.sha256.update(data)
+        while len(self.buffer) >= self.block_size:
+            self._stage(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def _stage(self, data):
+        block_id = new_block_id()
+        with timed('upload', self.container_name, nbytes=len(data)):
+            self.storage.stage_block(self.container_name, self.blob_name, block_id, data)
+        self.block_ids.append(block_id)
+
+    def commit(self, metadata=None):
+        if self.buffer or not self.block_ids:
+            self._stage(bytes(self.buffer))
+            self.buffer = bytearray()
+        with timed('upload', self.container_name):
+            return self.storage.commit_blocks(self.container_name, self.blob_name, self.block_ids, metadata=metadata)
+
+    def discard(self):
+        self.buffer = bytearray()
+        self.storage.discard_blocks(self.container_name, self.blob_name)
+
+
+def blob_name_for(base_name, fmt):
+    return f"{base_name}.{'ndjson' if fmt == 'ndjson' else 'json'}"
+
+
+def decode_blob(blob_name, data):
+    # JSON array blobs and NDJSON blobs both decode to a list of records
+    if blob_name.endswith('.ndjson'):
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
+    return json.loads(data)
+
+
+def iter_ndjson(chunks):
+    # Records of an NDJSON blob read in chunks; a line split across two chunks is joined first
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def read_blob_records(storage, container_name, blob_name):
+    # Records of a blob written by stream_csv_to_blob, in any of FORMATS; NDJSON is
+    # decoded as it is downloaded instead of after the whole blob is in memory
+    if blob_name.endswith('.ndjson'):
+        return list(iter_ndjson(storage.iter_chunks(container_name, blob_name)))
+    with timed('fetch', container_name) as stage:
+        data, _ = storage.download(container_name, blob_name)
+        stage.bytes = len(data)
+    if blob_name.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        return pq.read_table(pa.BufferReader(data)).to_pylist()
+    return decode_blob(blob_name, data)
+
+
+def conform(table, schema):
+    # Later chunks must match the schema of the first one; widen where pyarrow can
+    if table.schema.equals(schema):
+        return table
+    try:
+        return table.select(schema.names).cast(schema)
+    except Exception as e:
+        raise ValueError(f"CSV columns changed type between chunks ({e}); raise INGEST_CHUNK_ROWS") from e
+
+
+def current_metadata(storage, container_name, blob_name):
+    try:
+        return storage.get_properties(container_name, blob_name).metadata
+    except NotFoundError:
+        return {}
+
+
+def content_version(props):
+    # Content hash written at ingest, or the ETag for blobs uploaded before hashing
+    return props.metadata.get('content_sha256') or props.etag
+
+
+def source_metadata(response):
+    metadata = {
+        'source_etag': response.headers.get('ETag'),
+        'source_last_modified': response.headers.get('Last-Modified')
+    }
+    return {k: v for k, v in metadata.items() if v}
+
+
+def open_csv_stream(url, previous=None, timeout=60):
+    # Returns None when upstream answers 304 Not Modified to the stored validators
+    headers = {}
+    if previous:
+        if previous.get('source_etag'):
+            headers['If-None-Match'] = previous['source_etag']
+        if previous.get('source_last_modified'):
+            headers['If-Modified-Since'] = previous['source_last_modified']
+    response = requests.get(url, stream=True, timeout=timeout, headers=headers)
+    if response.status_code == 304:
+        response.close()
+        return None
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return response
+
+
+def stream_csv_to_blob(url, storage, container_name, blob_name, fmt='json', chunk_rows=DEFAULT_CHUNK_ROWS,
+                       block_size=DEFAULT_CHUNK_SIZE, metadata=None, progress=None, conditional=True, on_chunk=None):
+    # progress, if given, is called after every chunk as progress(bytes_moved=..., rows=...);
+    # on_chunk, if given, receives every parsed DataFrame chunk (e.g. to build rollups on the way through)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown ingest format {fmt}")
+
+    storage.ensure_container(container_name)
+    previous = current_metadata(storage, container_name, blob_name) if conditional else {}
+    with timed('fetch', container_name):
+        response = open_csv_stream(url, previous)
+    if response is None:
+        return {'unchanged': True, 'rows': 0, 'bytes': 0, 'columns': [], 'sha256': previous.get('content_sha256')}
+
+    writer = BlockWriter(storage, container_name, blob_name, block_size)
+    rows = 0
+    columns = None
+    parquet_writer = None
+    schema = None
+
+    try:
+        # Reading the next chunk includes pulling its bytes off the network
+        for chunk in timed_iter(pd.read_csv(response.raw, chunksize=chunk_rows), 'parse', container_name):
+            position = writer.position
+            if columns is None:
+                columns = list(chunk.columns)
+            if on_chunk is not None:
+                on_chunk(chunk)
+            if fmt == 'json':
+                # Splice the chunk arrays into one JSON array, same shape as to_json(orient='records')
+                with timed('transform', container_name, rows=len(chunk)) as stage:
+                    inner = chunk.to_json(orient='records')[1:-1]
+                    stage.bytes = len(inner)
+                if inner:
+                    writer.write(('[' if rows == 0 else ',') + inner)
+            elif fmt == 'ndjson':
+                with timed('transform', container_name, rows=len(chunk)) as stage:
+                    lines = chunk.to_json(orient='records', lines=True)
+                    stage.bytes = len(lines)
+                writer.write(lines if lines.endswith('\n') else lines + '\n')
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                # Encoding and writing happen together here, so full blocks are uploaded inside this stage
+                with timed('transform', container_name, rows=len(chunk)):
+                    table = pa.Table.from_pandas(chunk.convert_dtypes(), preserve_index=False)
+                    if parquet_writer is None:
+                        schema = table.schema
+                        parquet_writer = pq.ParquetWriter(writer, schema, compression='zstd')
+                    parquet_writer.write_table(conform(table, schema))
+            rows += len(chunk)
+            if progress is not None:
+                progress(bytes_moved=writer.position - position, rows=len(chunk))
+    finally:
+        response.close()
+
+    if fmt == 'json':
+        writer.write('[]' if rows == 0 else ']')
+    elif parquet_writer is not None:
+        parquet_writer.close()
+
+    digest = writer.sha256.hexdigest()
+    blob_metadata = dict(metadata or {}, content_sha256=digest, **source_metadata(response))
+    result = {'unchanged': False, 'rows': rows, 'bytes': writer.position, 'columns': columns or [], 'sha256': digest}
+    if previous.get('content_sha256') == digest:
+        # Same content behind new validators: keep the blob, remember the validators
+        writer.discard()
+        storage.set_metadata(container_name, blob_name, dict(previous, **blob_metadata))
+        result['unchanged'] = True
+        return result
+
+    result['etag'] = writer.commit(metadata=blob_metadata)
+    return result
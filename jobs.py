@@ -0,0 +1,103 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# In-process background jobs for the fetch-and-upload endpoints.
+# A job runs on a small worker pool and reports progress as it goes. Submitting a job
+# while one with the same key is queued or running returns the in-flight job instead
+# of starting the same refresh twice.
+
+
+class Job:
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = 'queued'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.bytes_moved = 0
+        self.rows = 0
+        self.message = None
+        self.error = None
+        self.result = None
+        self._lock = threading.Lock()
+
+    def report(self, bytes_moved=0, rows=0, message=None):
+        with self._lock:
+            self.bytes_moved += bytes_moved
+            self.rows += rows
+            if message is not None:
+                self.message = message
+
+    @property
+    def in_flight(self):
+        return self.status in ('queued', 'running')
+
+    def to_dict(self):
+        end = self.finished_at or time.time()
+        return {
+            'job_id': self.id,
+            'key': self.key,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'duration_seconds': round(end - self.started_at, 3) if self.started_at else None,
+            'bytes_moved': self.bytes_moved,
+            'rows': self.rows,
+            'message': self.message,
+            'error': self.error,
+            'result': self.result
+        }
+
+
+class JobRunner:
+    def __init__(self, max_workers=2, history=100):
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn):
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None:
+                return job, False  # Coalesce with the refresh already queued or running
+            job = Job(key)
+            self._in_flight[key] = job
+            self._jobs[job.id] = job
+            # Forget the oldest finished jobs
+            while len(self._jobs) > self.history:
+                oldest_id = next((j for j, old in self._jobs.items() if not old.in_flight), None)
+                if oldest_id is None:
+                    break
+                del self._jobs[oldest_id]
+        self._executor.submit(self._run, job, fn)
+        return job, True
+
+    def _run(self, job, fn):
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = fn(job)
+            job.status = 'succeeded'
+        except Exception as e:
+            print(f"Job {job.key} ({job.id}) failed: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._in_flight.pop(job.key, None)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
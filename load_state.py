@@ -0,0 +1,38 @@
+# Records which version of each source was last loaded into SQL, so a loader can
+# compare it with the blob metadata and skip unchanged sources without downloading them.
+
+def ensure_load_state_table(cursor):
+    cursor.execute("""
+    IF OBJECT_ID('NFLLoadState') IS NULL
+    CREATE TABLE NFLLoadState (
+        dataset NVARCHAR(200) NOT NULL PRIMARY KEY,
+        version NVARCHAR(200) NOT NULL,
+        loaded_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+    )
+    """)
+
+
+def get_loaded_version(conn, dataset):
+    cursor = conn.cursor()
+    ensure_load_state_table(cursor)
+    conn.commit()
+    cursor.execute("SELECT version FROM NFLLoadState WHERE dataset = ?", dataset)
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+
+def set_loaded_version(conn, dataset, version):
+    cursor = conn.cursor()
+    ensure_load_state_table(cursor)
+    cursor.execute("""
+    MERGE NFLLoadState AS target
+    USING (SELECT ? AS dataset, ? AS version) AS source
+    ON (target.dataset = source.dataset)
+    WHEN MATCHED THEN
+        UPDATE SET version = source.version, loaded_at = SYSUTCDATETIME()
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT (dataset, version) VALUES (source.dataset, source.version);
+    """, dataset, version)
+    conn.commit()
+    cursor.close()
@@ -0,0 +1,200 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-stage timing for the API and the loaders.
+# Code paths wrap their stages in timed(stage, source) and report rows/bytes on the
+# yielded record; durations go into histograms keyed by (stage, source). app.py serves
+# them at /metrics in the Prometheus text format and the scripts call print_summary()
+# at the end of a run. instrument() wraps a DB-API connection so every execute and
+# commit is timed without touching the SQL code.
+#
+# Stages: fetch, parse, transform, serialize, upload, sql_execute, commit.
+# source is the blob container for storage paths and the dataset name for SQL loads.
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}  # (stage, source) -> [Histogram, rows, bytes]
+        self.requests = {}  # (endpoint, method, status) -> Histogram
+
+    def observe(self, stage, source, seconds, rows=0, nbytes=0):
+        with self._lock:
+            entry = self.stages.get((stage, source))
+            if entry is None:
+                entry = self.stages[(stage, source)] = [Histogram(), 0, 0]
+            entry[0].observe(seconds)
+            entry[1] += rows
+            entry[2] += nbytes
+
+    def observe_request(self, endpoint, method, status, seconds):
+        with self._lock:
+            histogram = self.requests.get((endpoint, method, status))
+            if histogram is None:
+                histogram = self.requests[(endpoint, method, status)] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.requests.clear()
+
+
+registry = Registry()
+
+
+class Timing:
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+
+@contextmanager
+def timed(stage, source, rows=0, nbytes=0):
+    # Counts can be passed up front or set on the yielded record once they are known
+    record = Timing()
+    record.rows = rows
+    record.bytes = nbytes
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        registry.observe(stage, source, time.perf_counter() - start, record.rows, record.bytes)
+
+
+def timed_iter(items, stage, source):
+    # Times the production of each item, e.g. reading the next chunk of a CSV stream
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        registry.observe(stage, source, time.perf_counter() - start, rows=len(item))
+        yield item
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor, source):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_source', source)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)  # e.g. fast_executemany
+
+    def execute(self, *args):
+        with timed('sql_execute', self._source):
+            self._cursor.execute(*args)
+        return self
+
+    def executemany(self, query, params):
+        with timed('sql_execute', self._source, rows=len(params)):
+            self._cursor.executemany(query, params)
+        return self
+
+
+class InstrumentedConnection:
+    def __init__(self, conn, source):
+        self._conn = conn
+        self._source = source
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self):
+        return InstrumentedCursor(self._conn.cursor(), self._source)
+
+    def commit(self):
+        with timed('commit', self._source):
+            self._conn.commit()
+
+
+def instrument(conn, source):
+    return conn if isinstance(conn, InstrumentedConnection) else InstrumentedConnection(conn, source)
+
+
+def format_labels(**labels):
+    return ','.join(f'{name}="{str(value)}"' for name, value in labels.items())
+
+
+def format_histogram(lines, name, histogram, labels):
+    cumulative = 0
+    for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{format_labels(**labels, le=bound)}}} {cumulative}')
+    lines.append(f'{name}_sum{{{format_labels(**labels)}}} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{{{format_labels(**labels)}}} {histogram.count}')
+
+
+def render_prometheus():
+    with registry._lock:
+        stages = {key: (histogram, rows, nbytes) for key, (histogram, rows, nbytes) in registry.stages.items()}
+        requests = dict(registry.requests)
+
+    lines = [
+        '# HELP nfl_stage_duration_seconds Time spent per pipeline stage.',
+        '# TYPE nfl_stage_duration_seconds histogram'
+    ]
+    for (stage, source), (histogram, _, _) in sorted(stages.items()):
+        format_histogram(lines, 'nfl_stage_duration_seconds', histogram, {'stage': stage, 'source': source})
+    for metric, position, help_text in (('nfl_stage_rows_total', 1, 'Rows processed per pipeline stage.'),
+                                        ('nfl_stage_bytes_total', 2, 'Bytes processed per pipeline stage.')):
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+        for (stage, source), values in sorted(stages.items()):
+            lines.append(f'{metric}{{{format_labels(stage=stage, source=source)}}} {values[position]}')
+
+    lines += [
+        '# HELP nfl_http_request_duration_seconds Time spent serving HTTP requests.',
+        '# TYPE nfl_http_request_duration_seconds histogram'
+    ]
+    for (endpoint, method, status), histogram in sorted(requests.items()):
+        format_histogram(lines, 'nfl_http_request_duration_seconds', histogram,
+                         {'endpoint': endpoint, 'method': method, 'status': status})
+    return '\n'.join(lines) + '\n'
+
+
+def summary():
+    with registry._lock:
+        return [
+            {
+                'stage': stage, 'source': source, 'count': histogram.count, 'seconds': histogram.sum,
+                'max_seconds': histogram.max, 'rows': rows, 'bytes': nbytes
+            }
+            for (stage, source), (histogram, rows, nbytes) in sorted(registry.stages.items(), key=lambda s: s[0][::-1])
+        ]
+
+
+def print_summary():
+    stages = summary()
+    if not stages:
+        return
+    print(f"{'source':<24} {'stage':<12} {'calls':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'rows':>9} {'MB':>8}")
+    for s in stages:
+        print(
+            f"{s['source']:<24} {s['stage']:<12} {s['count']:>7} {s['seconds']:>9.3f} "
+            f"{s['seconds'] / s['count'] * 1000:>9.1f} {s['max_seconds'] * 1000:>9.1f} {s['rows']:>9} "
+            f"{s['bytes'] / 1e6:>8.2f}"
+        )
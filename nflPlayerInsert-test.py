@@ -1,5 +1,7 @@
 import os
 import pyodbc
+from datasets import DRAFT
+from bulk_load import quote
 
 # Get the environment variables for connection
 sql_server = os.getenv('AZURE_SQL_SERVER')
@@ -20,7 +22,7 @@ conn_str = (
 conn = pyodbc.connect(conn_str)
 cursor = conn.cursor()
 
-# Sample data to insert (make sure the data aligns with the table structure)
+# Sample draft pick to insert; the column list comes from the draft dataset spec
 data = [
     {
         'age': 25,
@@ -57,21 +59,22 @@ data = [
         'seasons_started': 2,
         'side': 'O',
         'team': 'STE',
-        '[to]': 2,
+        'to': 2,
         'w_av': 7.0
     }
 ]
 
 # Insert data
+columns = DRAFT.columns
+insert_query = f"""
+INSERT INTO {DRAFT.sink.table} ({', '.join(quote(c) for c in columns)})
+VALUES ({', '.join('?' for _ in columns)})
+"""
 for player in data:
-    cursor.execute("""
-    INSERT INTO NFLRoster (age, allpro, car_av, category, cfb_player_id, college, def_ints, def_sacks, def_solo_tackles, dr_av, games, gsis_id, hof, pass_attempts, pass_completions, pass_ints, pass_tds, pass_yards, pfr_player_id, pfr_player_name, pick, position, probowls, rec_tds, rec_yards, receptions, round, rush_atts, rush_tds, rush_yards, season, seasons_started, side, team, [to], w_av)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, 
-    player['age'], player['allpro'], player['car_av'], player['category'], player['cfb_player_id'], player['college'], player['def_ints'], player['def_sacks'], player['def_solo_tackles'], player['dr_av'], player['games'], player['gsis_id'], player['hof'], player['pass_attempts'], player['pass_completions'], player['pass_ints'], player['pass_tds'], player['pass_yards'], player['pfr_player_id'], player['pfr_player_name'], player['pick'], player['position'], player['probowls'], player['rec_tds'], player['rec_yards'], player['receptions'], player['round'], player['rush_atts'], player['rush_tds'], player['rush_yards'], player['season'], player['seasons_started'], player['side'], player['team'], player['[to]'], player['w_av'])
+    cursor.execute(insert_query, [player.get(DRAFT.mapping[c]) for c in columns])
 
 conn.commit()
 
 # Close the connection
 cursor.close()
-conn.close()
\ No newline at end of file
+conn.close()
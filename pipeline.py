@@ -0,0 +1,425 @@
+import hashlib
+import itertools
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyodbc
+import requests
+from dotenv import load_dotenv
+
+from bulk_load import DEFAULT_CHUNK_SIZE, bulk_insert, bulk_merge, delete_rows, ensure_sync_table, row_insert, sync_rows
+from columnar import parse_seasons, read_manifest, read_table
+from connections import ConnectionPool, connect, retry
+from ingest import DEFAULT_CHUNK_ROWS, blob_name_for, content_version, decode_blob, iter_ndjson
+from load_state import get_loaded_version, set_loaded_version
+from metrics import instrument, print_summary, timed
+from storage import get_storage
+
+# Declarative load pipeline shared by the blob2sql and api2sql scripts.
+# A DatasetSpec describes a dataset as a source (where DataFrames come from), a column
+# mapping (SQL column -> source field) and a SQL sink. run() reads the source in
+# chunks (a season blob or partition, or a run of NDJSON rows), shapes every chunk with
+# vectorized DataFrame operations and writes it through the sink, with reading/shaping
+# of the next chunk overlapping the SQL write of the current one.
+#
+# run_partitioned() is the parallel variant: the dataset is split by season or team and
+# the partitions are written on a pool of connections, each retried on transient errors.
+# Completed partitions are recorded in NFLLoadState, so a rerun only loads the rest.
+# Sinks whose writes are not idempotent (no key columns, no upsert, not sync) replace what
+# they load in both: run() deletes each season before writing its first chunk, and
+# run_partitioned() deletes a partition's rows before every attempt, so a retry never
+# inserts committed chunks twice and both leave the table in the same state.
+#
+# main() is the entry point of the loader scripts: it reads the load settings from the
+# environment and runs a spec serially or partitioned, so each script is one call.
+
+
+class BlobSource:
+    # blob_base may contain {season} for one blob per season (e.g. roster_{season}), in which case
+    # default_seasons() gives the seasons read when none are asked for; partition_prefix is the
+    # Parquet layout used when STORAGE_FORMAT=parquet
+    def __init__(self, container_name, blob_base, partition_prefix, default_seasons=None):
+        self.container_name = container_name
+        self.blob_base = blob_base
+        self.partition_prefix = partition_prefix
+        self.default_seasons = default_seasons
+        self.manifest = None
+
+    def key(self, fmt, seasons):
+        return f"{fmt}:{','.join(map(str, sorted(seasons))) if seasons else 'all'}"
+
+    def blob_names(self, storage, fmt, seasons):
+        if fmt == 'parquet':
+            self.manifest, _ = read_manifest(storage, self.container_name, self.partition_prefix)
+            return [p['blob'] for p in self.manifest['partitions'] if seasons is None or p['season'] in seasons]
+        if '{season}' in self.blob_base:
+            return [blob_name_for(self.blob_base.format(season=s), fmt) for s in sorted(seasons or self.default_seasons())]
+        return [blob_name_for(self.blob_base, fmt)]
+
+    def version(self, storage, fmt, seasons):
+        # Derived from blob properties only, so unchanged sources are never downloaded
+        names = self.blob_names(storage, fmt, seasons)
+        versions = [content_version(storage.get_properties(self.container_name, name)) for name in names]
+        return hashlib.sha256(','.join(versions).encode('utf-8')).hexdigest()
+
+    def read(self, storage, fmt, seasons, fields):
+        if fmt == 'parquet':
+            if self.manifest is None:
+                self.blob_names(storage, fmt, seasons)
+            for partition in self.manifest['partitions']:
+                if seasons is None or partition['season'] in seasons:
+                    manifest = dict(self.manifest, partitions=[partition])
+                    table = read_table(storage, self.container_name, manifest, columns=fields)
+                    if table is not None:
+                        with timed('parse', self.container_name, rows=table.num_rows):
+                            df = table.to_pandas()
+                        yield df
+            return
+        for name in self.blob_names(storage, fmt, seasons):
+            for df in self.frames(storage, fmt, name):
+                if seasons is not None and '{season}' not in self.blob_base and 'season' in df.columns:
+                    df = df[df['season'].isin(seasons)]
+                yield df
+
+    def frames(self, storage, fmt, name):
+        if fmt == 'ndjson':
+            # Streamed: only one chunk of rows is held at a time
+            records = iter_ndjson(storage.iter_chunks(self.container_name, name))
+            while True:
+                batch = list(itertools.islice(records, DEFAULT_CHUNK_ROWS))
+                if not batch:
+                    return
+                with timed('parse', self.container_name, rows=len(batch)):
+                    df = pd.DataFrame.from_records(batch)
+                yield df
+        with timed('fetch', self.container_name) as stage:
+            blob_data, _ = storage.download(self.container_name, name)
+            stage.bytes = len(blob_data)
+        with timed('parse', self.container_name, nbytes=len(blob_data)) as stage:
+            df = pd.DataFrame.from_records(decode_blob(name, blob_data))
+            stage.rows = len(df)
+        yield df
+
+
+class RecordSource:
+    # Wraps a function returning a DataFrame, e.g. an API fetch; fetched once per run
+    def __init__(self, name, fetch):
+        self.name = name
+        self.fetch = fetch
+        self.df = None
+
+    def key(self, fmt, seasons):
+        return self.name
+
+    def version(self, storage, fmt, seasons):
+        self.df = self.fetch()
+        payload = self.df.to_json(orient='split', index=False, date_format='iso')
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def read(self, storage, fmt, seasons, fields):
+        yield self.df if self.df is not None else self.fetch()
+
+
+class SqlSink:
+    def __init__(self, table, key_columns=None, label_column=None, upsert=False, sync_key_types=None,
+                 entity_column=None, scope_column='season'):
+        self.table = table
+        self.key_columns = key_columns
+        self.label_column = label_column
+        self.upsert = upsert
+        self.sync_key_types = sync_key_types
+        self.entity_column = entity_column
+        self.scope_column = scope_column
+
+    def idempotent(self, mode):
+        # Whether writing the same rows twice leaves the table unchanged, i.e. a partial write can be retried
+        return mode == 'sync' or self.upsert or bool(self.key_columns)
+
+    def clear(self, conn, filters):
+        return delete_rows(conn, self.table, filters)
+
+    def prepare(self, conn, mode):
+        # Create shared side tables once, before parallel writers race to do it
+        if mode == 'sync' and self.sync_key_types:
+            cursor = conn.cursor()
+            ensure_sync_table(cursor, f'{self.table}Sync', self.sync_key_types)
+            conn.commit()
+            cursor.close()
+
+    def write(self, conn, columns, rows, mode, chunk_size=DEFAULT_CHUNK_SIZE):
+        if mode == 'sync':
+            if not self.sync_key_types:
+                raise ValueError(f"{self.table} does not support sync mode")
+            return sync_rows(
+                conn, self.table, columns, rows, key_types=self.sync_key_types, entity_column=self.entity_column,
+                scope_column=self.scope_column, label_column=self.label_column, chunk_size=chunk_size
+            )
+        if mode == 'bulk' and self.upsert:
+            return {'merged': bulk_merge(conn, self.table, columns, rows, key_columns=self.key_columns)}
+        if mode == 'bulk':
+            inserted, skipped, failed = bulk_insert(
+                conn, self.table, columns, rows, key_columns=self.key_columns,
+                label_column=self.label_column, chunk_size=chunk_size
+            )
+        else:
+            inserted, skipped, failed = row_insert(
+                conn, self.table, columns, rows, key_columns=self.key_columns,
+                label_column=self.label_column, upsert=self.upsert
+            )
+        return {'inserted': inserted, 'skipped': skipped, 'failed': failed}
+
+
+class DatasetSpec:
+    def __init__(self, name, source, columns, sink, required=None, partitions=None):
+        self.name = name
+        self.source = source
+        # columns is a list of SQL columns named like the source fields, or a dict of SQL column -> source field
+        self.mapping = columns if isinstance(columns, dict) else {c: c for c in columns}
+        self.columns = list(self.mapping)
+        self.fields = list(dict.fromkeys(self.mapping.values()))
+        self.sink = sink
+        self.required = required or []
+        # Partition name ('season', 'team') -> source field, for run_partitioned()
+        self.partitions = partitions or {}
+
+
+def shape(df, spec):
+    # Drop rows missing a required field, then select and rename all columns at once
+    if spec.required:
+        present = [f for f in spec.required if f in df.columns]
+        if len(present) < len(spec.required):
+            return []
+        mask = df[present].notna().all(axis=1) & (df[present].astype(str) != '').all(axis=1)
+        df = df[mask]
+    out = pd.DataFrame(
+        {column: df[field] if field in df.columns else None for column, field in spec.mapping.items()},
+        index=df.index
+    )
+    # NaN/NaT -> None and numpy scalars -> Python objects for the ODBC driver
+    out = out.astype(object).where(out.notna(), None)
+    return list(out.itertuples(index=False, name=None))
+
+
+def sql_value(value):
+    # Partition values come out of pandas as numpy scalars or NaN
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def scope_filter(spec, df):
+    # The SQL rows a chunk replaces: the scopes (seasons) it holds
+    scope_field = spec.mapping.get(spec.sink.scope_column)
+    if scope_field is None or scope_field not in df.columns:
+        raise ValueError(f"{spec.name} rows have no {spec.sink.scope_column} to replace by; use sync mode")
+    values = sorted({sql_value(v) for v in df[scope_field].unique()}, key=lambda v: (v is None, v))
+    return {spec.sink.scope_column: values}
+
+
+def partition_filter(spec, field, value, part):
+    # The SQL rows a partition replaces: its own value, within the scopes (seasons) it holds
+    columns = {f: c for c, f in spec.mapping.items()}
+    filters = {columns[field]: [sql_value(value)]}
+    if spec.mapping.get(spec.sink.scope_column) != field:
+        filters.update(scope_filter(spec, part))
+    return filters
+
+
+def run(spec, conn, storage=None, mode='bulk', fmt='json', seasons=None, chunk_size=DEFAULT_CHUNK_SIZE, force=False):
+    conn = instrument(conn, spec.name)
+    source_version = spec.source.version(storage, fmt, seasons)
+    load_key = f"{spec.sink.table}:{mode}:{spec.source.key(fmt, seasons)}"
+    if not force and get_loaded_version(conn, load_key) == source_version:
+        print(f"{spec.name}: source data unchanged since the last load, nothing to do")
+        return None
+
+    # Read + shape on a background thread; at most two shaped chunks wait for the sink
+    chunks = queue.Queue(maxsize=2)
+    replace = not spec.sink.idempotent(mode)
+
+    def produce():
+        try:
+            for df in spec.source.read(storage, fmt, seasons, spec.fields):
+                if not len(df):
+                    continue
+                with timed('transform', spec.name, rows=len(df)):
+                    rows = shape(df, spec)
+                chunks.put((rows, scope_filter(spec, df) if replace else None))
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(None)
+
+    threading.Thread(target=produce, name=f'{spec.name}-source', daemon=True).start()
+
+    totals = {}
+    cleared = set()
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            break
+        if isinstance(chunk, Exception):
+            raise chunk
+        rows, filters = chunk
+        if filters is not None:
+            # Same as run_partitioned(): the seasons being loaded are replaced, not appended to.
+            # A season spread over several chunks is cleared before its first one only
+            scopes = [v for v in filters[spec.sink.scope_column] if v not in cleared]
+            if scopes:
+                spec.sink.clear(conn, {spec.sink.scope_column: scopes})
+                cleared.update(scopes)
+        counts = spec.sink.write(conn, spec.columns, rows, mode, chunk_size)
+        for name, value in counts.items():
+            totals[name] = totals.get(name, 0) + value
+
+    # Failed rows are only retried if the next run does not consider this version loaded
+    if totals.get('failed', 0):
+        print(f"{spec.name}: {totals['failed']} rows failed, the next run will retry them")
+    else:
+        set_loaded_version(conn, load_key, source_version)
+    print(f"{spec.name}: {json.dumps(totals)}")
+    return totals
+
+
+def run_partitioned(spec, pool, storage=None, mode='bulk', fmt='json', seasons=None, partition_by='season',
+                    chunk_size=DEFAULT_CHUNK_SIZE, force=False, attempts=4):
+    field = spec.partitions.get(partition_by)
+    if field is None:
+        raise ValueError(f"{spec.name} cannot be partitioned by {partition_by}")
+    if mode == 'sync' and spec.mapping.get(spec.sink.scope_column) != field:
+        # Sync marks entities missing from a scope as dropped, so a partition must hold whole scopes
+        raise ValueError(f"sync mode can only be partitioned by {spec.sink.scope_column}")
+
+    load_key = f"{spec.sink.table}:{mode}:{spec.source.key(fmt, seasons)}"
+
+    def check():
+        with pool.connection() as conn:
+            conn = instrument(conn, spec.name)
+            version = spec.source.version(storage, fmt, seasons)
+            loaded = get_loaded_version(conn, load_key)
+            spec.sink.prepare(conn, mode)
+            return version, loaded
+
+    source_version, loaded_version = retry(check, attempts, label=spec.name)
+    if not force and loaded_version == source_version:
+        print(f"{spec.name}: source data unchanged since the last load, nothing to do")
+        return None
+
+    frames = [df for df in spec.source.read(storage, fmt, seasons, spec.fields) if len(df)]
+    partitions = list(pd.concat(frames, ignore_index=True).groupby(field, sort=True, dropna=False)) if frames else []
+    replace = not spec.sink.idempotent(mode)
+
+    def load(value, part):
+        # Partitions finished by an earlier run of the same source version are skipped
+        partition_key = f"{load_key}:{partition_by}={value}"
+
+        def write():
+            with pool.connection() as conn:
+                conn = instrument(conn, spec.name)
+                if not force and get_loaded_version(conn, partition_key) == source_version:
+                    return None
+                with timed('transform', spec.name, rows=len(part)):
+                    rows = shape(part, spec)
+                if replace:
+                    # Whatever an earlier attempt or load committed for this partition is replaced
+                    spec.sink.clear(conn, partition_filter(spec, field, value, part))
+                counts = spec.sink.write(conn, spec.columns, rows, mode, chunk_size)
+                if not counts.get('failed', 0):
+                    set_loaded_version(conn, partition_key, source_version)
+                return counts
+
+        return retry(write, attempts, label=f"{spec.name} {partition_by}={value}")
+
+    totals = {}
+    skipped = 0
+    failures = []
+    with ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix=f'{spec.name}-load') as executor:
+        futures = {executor.submit(load, value, part): value for value, part in partitions}
+        for future, value in futures.items():
+            try:
+                counts = future.result()
+            except Exception as e:
+                print(f"{spec.name}: {partition_by}={value} failed: {e}")
+                failures.append(value)
+                continue
+            if counts is None:
+                skipped += 1
+                continue
+            for name, count in counts.items():
+                totals[name] = totals.get(name, 0) + count
+
+    print(f"{spec.name}: {len(partitions)} partitions by {partition_by}, {skipped} already loaded, "
+          f"{len(failures)} failed: {json.dumps(totals)}")
+    if failures:
+        raise RuntimeError(f"{len(failures)} {spec.name} partitions failed; rerun to load them")
+
+    if totals.get('failed', 0):
+        print(f"{spec.name}: {totals['failed']} rows failed, the next run will retry them")
+        return totals
+    with pool.connection() as conn:
+        set_loaded_version(instrument(conn, spec.name), load_key, source_version)
+    return totals
+
+
+def main(spec, mode='row', partition_by='season'):
+    # mode and partition_by are the defaults for LOAD_MODE and LOAD_PARTITION_BY
+    load_dotenv()
+
+    # Load mode: 'row' writes one row at a time, 'bulk' sends set-based batches, 'sync' only
+    # writes rows that are new or changed since the last sync. Sinks without key columns
+    # (NFLRoster) replace the loaded seasons in 'row' and 'bulk': their existing rows are
+    # deleted first, with or without LOAD_CONNECTIONS
+    load_mode = os.getenv('LOAD_MODE', mode)
+    chunk_size = int(os.getenv('LOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+
+    # Source layout: 'json'/'ndjson' read whole blobs, 'parquet' reads only the needed season partitions and columns
+    storage_format = os.getenv('STORAGE_FORMAT', 'json')
+    load_seasons = parse_seasons(os.getenv('LOAD_SEASONS')) if os.getenv('LOAD_SEASONS') else None
+
+    # Unchanged sources are skipped unless FORCE_LOAD=1
+    force_load = os.getenv('FORCE_LOAD') == '1'
+
+    # Parallel loading: LOAD_CONNECTIONS > 1 splits the data by LOAD_PARTITION_BY ('season' or 'team') and loads
+    # the partitions on that many pooled connections, retrying transient errors up to LOAD_RETRIES times
+    load_connections = int(os.getenv('LOAD_CONNECTIONS', 1))
+    partition_by = os.getenv('LOAD_PARTITION_BY', partition_by)
+    load_retries = int(os.getenv('LOAD_RETRIES', 4))
+
+    conn = pool = None
+    try:
+        # API sources fetch their own data; only blob sources need storage
+        storage = get_storage() if isinstance(spec.source, BlobSource) else None
+        if load_connections > 1:
+            pool = ConnectionPool(connect, size=load_connections)
+            totals = run_partitioned(
+                spec, pool, storage=storage, mode=load_mode, fmt=storage_format, seasons=load_seasons,
+                partition_by=partition_by, chunk_size=chunk_size, force=force_load, attempts=load_retries
+            )
+        else:
+            conn = connect()
+            print("Connected to SQL Server")
+
+            totals = run(
+                spec, conn, storage=storage, mode=load_mode, fmt=storage_format,
+                seasons=load_seasons, chunk_size=chunk_size, force=force_load
+            )
+        print("Data inserted successfully")
+        return totals
+
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching data from API: {e}")
+    except pyodbc.Error as e:
+        print(f"Error connecting to SQL Server: {e}")
+    except RuntimeError as e:
+        print(e)
+    finally:
+        if conn is not None:
+            conn.close()
+        if pool is not None:
+            pool.close()
+        # Per-stage durations, rows and bytes for this run
+        print_summary()
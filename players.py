@@ -0,0 +1,148 @@
+import json
+import math
+import threading
+
+from dataset_index import normalize
+from espn import normalize_schedule
+
+# Cross-dataset player lookup behind /players/<id>.
+# PlayerIndex joins the draft rows, the roster rows and the team schedule once per set
+# of source versions: roster and draft rows are merged into one profile per player
+# (on gsis_id, or on the PFR id for players drafted before gsis ids existed), and every
+# known (id type, id) of a player points at that profile, so a lookup by any id is a dict
+# hit. Id types are separate namespaces: a bare id that is, say, one player's ESPN id
+# and another's Yahoo id matches both, and the caller has to name the id type.
+
+# Source field -> id type in the merged profile
+DRAFT_IDS = {'gsis_id': 'gsis_id', 'pfr_player_id': 'pfr_id', 'cfb_player_id': 'cfb_id'}
+ROSTER_IDS = {
+    'gsis_id': 'gsis_id', 'pfr_id': 'pfr_id', 'espn_id': 'espn_id', 'esb_id': 'esb_id', 'gsis_it_id': 'gsis_it_id',
+    'sleeper_id': 'sleeper_id', 'yahoo_id': 'yahoo_id', 'rotowire_id': 'rotowire_id', 'pff_id': 'pff_id',
+    'sportradar_id': 'sportradar_id', 'fantasy_data_id': 'fantasy_data_id', 'smart_id': 'smart_id'
+}
+
+ID_TYPES = sorted(set(DRAFT_IDS.values()) | set(ROSTER_IDS.values()))
+
+# nflverse team codes that differ from ESPN's
+TEAM_ALIASES = {'LA': 'LAR', 'WAS': 'WSH'}
+
+
+def clean_id(value):
+    if value is None or value == '' or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def schedule_games(data):
+    # The schedule blob holds either the raw ESPN payload or NFLSchedule-shaped rows
+    events = data.get('events', []) if isinstance(data, dict) else data
+    if events and 'competitions' in events[0]:
+        df, _ = normalize_schedule(events)
+        events = json.loads(df.to_json(orient='records', date_format='iso'))
+    games = {}
+    for game in events:
+        for side in ('HomeTeamAbbreviation', 'AwayTeamAbbreviation'):
+            if game.get(side):
+                games.setdefault(game[side], []).append(game)
+    return games
+
+
+class PlayerIndex:
+    def __init__(self, draft, roster, schedule, versions=None):
+        self.versions = versions
+        self.profiles = {}
+        self.ids = {}  # (id_type, normalized id) -> profile key
+        self.values = {}  # normalized id -> {profile key: [id types]}
+
+        # Latest roster row per player (highest season, then week) is the current one
+        for row in roster:
+            gsis_id = clean_id(row.get('gsis_id'))
+            if gsis_id is None:
+                continue
+            profile = self.profiles.get(gsis_id)
+            order = (row.get('season') or 0, row.get('week') or 0)
+            if profile is None or order >= profile['_order']:
+                self.profiles[gsis_id] = dict(profile or {'draft': None}, roster=row, _order=order)
+
+        by_pfr = {clean_id(p['roster'].get('pfr_id')): key for key, p in self.profiles.items()}
+        by_pfr.pop(None, None)
+        for row in draft:
+            gsis_id = clean_id(row.get('gsis_id'))
+            pfr_id = clean_id(row.get('pfr_player_id'))
+            key = gsis_id if gsis_id in self.profiles else by_pfr.get(pfr_id) or gsis_id or (pfr_id and f'pfr:{pfr_id}')
+            if key is None:
+                continue
+            self.profiles.setdefault(key, {'roster': None, '_order': None})['draft'] = row
+
+        self.games = schedule_games(schedule)
+        for key, profile in self.profiles.items():
+            del profile['_order']
+            profile['ids'] = self.collect_ids(profile)
+            for id_type, value in profile['ids'].items():
+                self.ids.setdefault((id_type, normalize(value)), key)
+                self.values.setdefault(normalize(value), {}).setdefault(key, []).append(id_type)
+
+    @staticmethod
+    def collect_ids(profile):
+        ids = {}
+        for row, fields in ((profile['draft'], DRAFT_IDS), (profile['roster'], ROSTER_IDS)):
+            for field, id_type in fields.items():
+                value = clean_id(row.get(field)) if row else None
+                if value is not None:
+                    ids.setdefault(id_type, value)
+        return ids
+
+    def matches(self, player_id, id_type=None):
+        # Keys of the profiles the id belongs to; more than one means the bare id is ambiguous
+        if id_type is not None:
+            key = self.ids.get((id_type, normalize(player_id)))
+            return [key] if key is not None else []
+        return list(self.values.get(normalize(player_id), ()))
+
+    def candidate(self, key, player_id):
+        # Short description of a profile an ambiguous id matched, with the id types it matched as
+        profile = self.profile(key)
+        return {
+            'player_id': key,
+            'name': profile['name'],
+            'position': profile['position'],
+            'team': profile['team'],
+            'id_types': self.values[normalize(player_id)][key]
+        }
+
+    def profile(self, key):
+        profile = self.profiles[key]
+        current = profile['roster'] or {}
+        drafted = profile['draft'] or {}
+        team = current.get('team') or drafted.get('team')
+        return {
+            'player_id': key,
+            'name': current.get('full_name') or drafted.get('pfr_player_name'),
+            'position': current.get('position') or drafted.get('position'),
+            'team': team,
+            'ids': profile['ids'],
+            'draft': profile['draft'],
+            'roster': profile['roster'],
+            'schedule': self.games.get(TEAM_ALIASES.get(team, team), []) if current else []
+        }
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_player_index(sources):
+    # sources: name -> cache entry (or None when the blob is missing); the index is
+    # rebuilt only when one of their versions changes
+    global _index
+    versions = tuple((name, entry.etag if entry else None) for name, entry in sorted(sources.items()))
+    index = _index
+    if index is None or index.versions != versions:
+        with _lock:
+            if _index is None or _index.versions != versions:
+                data = {name: json.loads(bytes(entry.body)) if entry else [] for name, entry in sources.items()}
+                _index = PlayerIndex(data['draft'], data['roster'], data['schedule'], versions)
+            index = _index
+    return index
@@ -0,0 +1,203 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from columnar import manifest_blob
+from storage import NotFoundError
+
+# Materialized draft rollups behind the /get-draft-aggregates endpoints.
+# While a draft refresh reads the CSV, DraftRollups aggregates every chunk with pandas
+# groupbys into additive per-season partials (counts and sums). Each season is stored
+# as its own small blob next to a manifest holding a fingerprint per season and the
+# all-seasons totals:
+#
+#   draft_rollups/manifest.json
+#   draft_rollups/season=1980.json
+#   ...
+#
+# A refresh only rewrites the seasons whose fingerprint changed. Fingerprints hash a
+# canonical text form of each row, so they do not depend on the dtypes pandas happens to
+# infer for the chunk a row arrives in. Requests without a
+# season filter are answered from the totals; filtered requests add up the requested
+# season partials.
+
+ROLLUP_PREFIX = 'draft_rollups'
+ROLLUPS = ('picks-by-team-round', 'car-av-by-position-college', 'hof-rate-by-round')
+
+
+def season_blob(season):
+    return f'{ROLLUP_PREFIX}/season={season}.json'
+
+
+def canonical_value(value):
+    # Numbers (int, float or numeric text) as floats, booleans as True/False, missing as ''
+    if value is None or value is pd.NA:
+        return ''
+    if isinstance(value, (bool, np.bool_)):
+        return str(bool(value))
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return value
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        value = float(value)
+        return '' if math.isnan(value) else repr(value)
+    return str(value)
+
+
+def row_hashes(df):
+    canonical = df[sorted(df.columns)].astype(object).apply(lambda column: column.map(canonical_value))
+    return pd.util.hash_pandas_object(canonical, index=False)
+
+
+def empty_partial():
+    return {'picks': {}, 'car_av': {}, 'hof': {}}
+
+
+def merge_partial(target, partial):
+    # Partials are counts and sums, so seasons and chunks combine by addition
+    for key, picks in partial['picks'].items():
+        target['picks'][key] = target['picks'].get(key, 0) + picks
+    for key, (total, players) in partial['car_av'].items():
+        current = target['car_av'].get(key, (0.0, 0))
+        target['car_av'][key] = (current[0] + total, current[1] + players)
+    for key, (hof, picks) in partial['hof'].items():
+        current = target['hof'].get(key, (0, 0))
+        target['hof'][key] = (current[0] + hof, current[1] + picks)
+    return target
+
+
+def encode_partial(partial):
+    return {
+        'picks': [[team, rnd, picks] for (team, rnd), picks in sorted(partial['picks'].items())],
+        'car_av': [[pos, college, total, players] for (pos, college), (total, players) in sorted(partial['car_av'].items())],
+        'hof': [[rnd, hof, picks] for rnd, (hof, picks) in sorted(partial['hof'].items())]
+    }
+
+
+def decode_partial(data):
+    return {
+        'picks': {(team, rnd): picks for team, rnd, picks in data['picks']},
+        'car_av': {(pos, college): (total, players) for pos, college, total, players in data['car_av']},
+        'hof': {rnd: (hof, picks) for rnd, hof, picks in data['hof']}
+    }
+
+
+class DraftRollups:
+    def __init__(self):
+        self.partials = {}  # season -> partial
+        self.fingerprints = {}  # season -> order-independent sum of row hashes
+
+    def add(self, df):
+        # One vectorized pass per chunk; only the aggregated groups are looped over
+        df = df[df['season'].notna() & df['round'].notna()]
+        if df.empty:
+            return
+        season = df['season'].astype(int)
+        keys = pd.DataFrame({
+            'season': season,
+            'team': df['team'].fillna('').astype(str),
+            'round': df['round'].astype(int),
+            'position': df['position'].fillna('').astype(str),
+            'college': df['college'].fillna('').astype(str),
+            'car_av': pd.to_numeric(df['car_av'], errors='coerce'),
+            'hof': df['hof'].eq(True).astype(int)
+        })
+
+        hashes = row_hashes(df).groupby(season).sum()
+        picks = keys.groupby(['season', 'team', 'round']).size()
+        car_av = keys.groupby(['season', 'position', 'college'])['car_av'].agg(['sum', 'count'])
+        hof = keys.groupby(['season', 'round'])['hof'].agg(['sum', 'size'])
+
+        chunk = {s: empty_partial() for s in hashes.index}
+        for (s, team, rnd), count in picks.items():
+            chunk[s]['picks'][(team, int(rnd))] = int(count)
+        for (s, pos, college), total, players in car_av.itertuples(name=None):
+            if players:
+                chunk[s]['car_av'][(pos, college)] = (float(total), int(players))
+        for (s, rnd), hof_picks, round_picks in hof.itertuples(name=None):
+            chunk[s]['hof'][int(rnd)] = (int(hof_picks), int(round_picks))
+
+        for s, partial in chunk.items():
+            s = int(s)
+            merge_partial(self.partials.setdefault(s, empty_partial()), partial)
+            # uint64 addition wraps, which keeps the fingerprint independent of chunk order
+            self.fingerprints[s] = (self.fingerprints.get(s, 0) + int(hashes[s])) % 2 ** 64
+
+    def totals(self):
+        totals = empty_partial()
+        for partial in self.partials.values():
+            merge_partial(totals, partial)
+        return totals
+
+
+def read_rollup_manifest(storage, container_name):
+    data, _ = storage.download(container_name, manifest_blob(ROLLUP_PREFIX))
+    return json.loads(data)
+
+
+def rollups_exist(storage, container_name):
+    try:
+        storage.get_properties(container_name, manifest_blob(ROLLUP_PREFIX))
+        return True
+    except NotFoundError:
+        return False
+
+
+def write_rollups(storage, container_name, rollups, source=None):
+    # Returns the seasons whose rollups were (re)written
+    try:
+        previous = read_rollup_manifest(storage, container_name)['seasons']
+    except NotFoundError:
+        previous = {}
+
+    seasons = {}
+    changed = []
+    for season, partial in sorted(rollups.partials.items()):
+        fingerprint = f'{rollups.fingerprints[season]:016x}'
+        blob_name = season_blob(season)
+        if previous.get(str(season), {}).get('fingerprint') != fingerprint:
+            storage.upload(container_name, blob_name, json.dumps(encode_partial(partial)), overwrite=True)
+            changed.append(season)
+        seasons[str(season)] = {'blob': blob_name, 'fingerprint': fingerprint}
+    for season, entry in previous.items():
+        if season not in seasons:
+            storage.delete(container_name, entry['blob'])
+            changed.append(int(season))
+
+    # Written last so readers never combine totals with season blobs of another version
+    manifest = {'seasons': seasons, 'totals': encode_partial(rollups.totals()), 'source': source or {}}
+    storage.upload(container_name, manifest_blob(ROLLUP_PREFIX), json.dumps(manifest), overwrite=True)
+    return sorted(changed)
+
+
+def read_rollup(storage, container_name, manifest, name, seasons=None):
+    if seasons is None:
+        partial = decode_partial(manifest['totals'])
+    else:
+        partial = empty_partial()
+        for season in sorted(seasons):
+            entry = manifest['seasons'].get(str(season))
+            if entry is not None:
+                data, _ = storage.download(container_name, entry['blob'])
+                merge_partial(partial, decode_partial(json.loads(data)))
+    return present(name, partial)
+
+
+def present(name, partial):
+    if name == 'picks-by-team-round':
+        return [{'team': team, 'round': rnd, 'picks': picks} for (team, rnd), picks in sorted(partial['picks'].items())]
+    if name == 'car-av-by-position-college':
+        return [
+            {'position': pos, 'college': college, 'players': players, 'avg_car_av': round(total / players, 2)}
+            for (pos, college), (total, players) in sorted(partial['car_av'].items())
+        ]
+    if name == 'hof-rate-by-round':
+        return [
+            {'round': rnd, 'picks': picks, 'hof': hof, 'hof_rate': round(hof / picks, 4) if picks else 0.0}
+            for rnd, (hof, picks) in sorted(partial['hof'].items())
+        ]
+    raise ValueError(f"Unknown rollup {name}")
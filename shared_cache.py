@@ -0,0 +1,116 @@
+import hashlib
+import os
+import uuid
+
+from blob_cache import CacheEntry
+
+# Cross-process response store for running the API under several worker processes
+# (SHARED_CACHE_DIR). Each version of a cached response (its body and compressed
+# variants) is written once to an Arrow IPC file, and every worker memory-maps that
+# file instead of holding its own copy, so the pages are shared through the OS page
+# cache. Layout, one directory per cache name:
+#
+#   <root>/<container>/<sha1(cache name)>/name             the cache name, for prefix invalidation
+#   <root>/<container>/<sha1(cache name)>/<sha1(etag)>.arrow
+#   <root>/<container>/<sha1(cache name)>/current           file name of the version to serve
+#
+# current is replaced atomically once a new version is fully written, so readers see
+# either the old or the new version. Superseded files are unlinked; workers that still
+# map one keep reading it until they drop the entry.
+# Only the serialized responses (unfiltered JSON and NDJSON bodies, rollups, snapshots)
+# are shared this way. Query indexes (dataset_index.py) and the player index (players.py)
+# are parsed from the body by each worker that serves a filtered, filtered-NDJSON or
+# /players request, so memory for those still grows with the number of workers.
+# pyarrow is only required when the store is enabled.
+
+IDENTITY = 'identity'
+
+
+class SharedCache:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _dir(self, container_name, name):
+        return os.path.join(self.root, container_name, hashlib.sha1(name.encode('utf-8')).hexdigest())
+
+    def _map(self, path, etag=None):
+        import pyarrow as pa
+
+        # Buffers point into the mapping; nothing is copied into the worker
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        stored_etag = table.schema.metadata[b'etag'].decode('utf-8')
+        if etag is not None and stored_etag != etag:
+            return None
+        bodies = {
+            encoding: memoryview(body.as_buffer())
+            for encoding, body in zip(table.column('encoding').to_pylist(), table.column('body'))
+        }
+        return CacheEntry(stored_etag, bodies.pop(IDENTITY), variants=bodies)
+
+    def _replace(self, path, data):
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, container_name, name, etag=None):
+        # The current version, or None when there is none (or it is not the given etag)
+        directory = self._dir(container_name, name)
+        try:
+            with open(os.path.join(directory, 'current')) as f:
+                version = f.read()
+            return self._map(os.path.join(directory, version), etag)
+        except FileNotFoundError:
+            return None  # No version yet, or it was swapped out while we looked
+
+    def put(self, container_name, name, entry):
+        import pyarrow as pa
+
+        directory = self._dir(container_name, name)
+        version = hashlib.sha1(entry.etag.encode('utf-8')).hexdigest() + '.arrow'
+        path = os.path.join(directory, version)
+        # A version is written by whichever worker builds it first; the others map that file
+        if not os.path.exists(path):
+            os.makedirs(directory, exist_ok=True)
+            encodings = [IDENTITY] + list(entry.variants)
+            table = pa.table(
+                {
+                    'encoding': encodings,
+                    'body': pa.array([entry.body] + [entry.variants[e] for e in encodings[1:]], type=pa.large_binary())
+                },
+                metadata={'etag': entry.etag}
+            )
+            tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+            self._replace(os.path.join(directory, 'name'), name)
+
+        self._replace(os.path.join(directory, 'current'), version)
+        for filename in os.listdir(directory):
+            if filename.endswith('.arrow') and filename != version:
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except OSError:
+                    pass  # Still mapped on a platform that does not allow unlinking it
+        return self._map(path)
+
+    def invalidate(self, container_name, name):
+        try:
+            os.remove(os.path.join(self._dir(container_name, name), 'current'))
+        except FileNotFoundError:
+            pass
+
+    def invalidate_prefix(self, container_name, prefix):
+        container_dir = os.path.join(self.root, container_name)
+        if not os.path.isdir(container_dir):
+            return
+        for directory in os.listdir(container_dir):
+            try:
+                with open(os.path.join(container_dir, directory, 'name')) as f:
+                    name = f.read()
+            except FileNotFoundError:
+                continue
+            if name.startswith(prefix):
+                self.invalidate(container_name, name)
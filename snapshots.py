@@ -0,0 +1,199 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from columnar import manifest_blob
+from storage import NotFoundError
+
+# Append-only weekly roster history behind /get-roster-data?as_of_week=N.
+# Every roster refresh is diffed against the latest stored state and only the
+# difference is uploaded, one delta blob per refresh:
+#
+#   roster_snapshots/2024/manifest.json
+#   roster_snapshots/2024/base.json                   first roster seen for the season
+#   roster_snapshots/2024/delta-0001-week=2.json      {"adds": [...], "removals": [...], "changes": {...}}
+#   ...
+#
+# Deltas are never rewritten. Each manifest entry carries a chain hash over everything
+# up to it, so reconstructed states can be cached under that hash and stay valid when
+# later deltas are appended. SnapshotReader keeps such checkpoints every few deltas and
+# rebuilds a week from the nearest one.
+
+SNAPSHOT_PREFIX = 'roster_snapshots'
+SNAPSHOT_KEY = 'gsis_id'
+# The snapshot week is tracked by the manifest, not diffed per player
+IGNORED_FIELDS = ('week',)
+CHECKPOINT_EVERY = 4
+
+
+def snapshot_prefix(season):
+    return f'{SNAPSHOT_PREFIX}/{season}'
+
+
+def snapshot_manifest_blob(season):
+    return manifest_blob(snapshot_prefix(season))
+
+
+def sha1(data):
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def split_weeks(records):
+    # A weekly file lists each player once per week; a season file once, as of its latest week
+    # Rows without a key never reach the state, so they do not count towards the check
+    keys = [k for k in (r.get(SNAPSHOT_KEY) for r in records) if k]
+    if len(set(keys)) == len(keys):
+        return {max((r.get('week') or 0 for r in records), default=0): records}
+    weeks = {}
+    for record in records:
+        weeks.setdefault(record.get('week') or 0, []).append(record)
+    return weeks
+
+
+def to_state(records):
+    return {r[SNAPSHOT_KEY]: r for r in records if r.get(SNAPSHOT_KEY)}
+
+
+def diff_states(old, new):
+    changes = {}
+    for key, row in new.items():
+        before = old.get(key)
+        if before is not None and before != row:
+            changed = {f: v for f, v in row.items() if f not in IGNORED_FIELDS and before.get(f) != v}
+            # Fields the new row no longer has are recorded as explicit nulls
+            changed.update((f, None) for f in before if f not in row and f not in IGNORED_FIELDS and before[f] is not None)
+            if changed:
+                changes[key] = changed
+    return {
+        'adds': [row for key, row in new.items() if key not in old],
+        'removals': [key for key in old if key not in new],
+        'changes': changes
+    }
+
+
+def apply_delta(state, delta):
+    # Unchanged rows are shared with the previous state
+    state = dict(state)
+    for key in delta['removals']:
+        state.pop(key, None)
+    for key, fields in delta['changes'].items():
+        state[key] = dict(state[key], **fields)
+    for row in delta['adds']:
+        state[row[SNAPSHOT_KEY]] = row
+    return state
+
+
+class SnapshotReader:
+    def __init__(self, max_checkpoints=64):
+        self.max_checkpoints = max_checkpoints
+        self._checkpoints = OrderedDict()  # chain hash -> state
+        self._lock = threading.Lock()
+
+    def _get(self, chain):
+        with self._lock:
+            state = self._checkpoints.get(chain)
+            if state is not None:
+                self._checkpoints.move_to_end(chain)
+            return state
+
+    def _put(self, chain, state):
+        with self._lock:
+            self._checkpoints[chain] = state
+            self._checkpoints.move_to_end(chain)
+            while len(self._checkpoints) > self.max_checkpoints:
+                self._checkpoints.popitem(last=False)
+
+    def state(self, storage, container_name, manifest, count):
+        # State after the base and the first `count` deltas
+        entries = [manifest['base']] + manifest['deltas'][:count]
+        start = None
+        for position in range(len(entries) - 1, -1, -1):
+            state = self._get(entries[position]['chain'])
+            if state is not None:
+                start = position
+                break
+        if start is None:
+            data, _ = storage.download(container_name, manifest['base']['blob'])
+            state = to_state(json.loads(data))
+            start = 0
+            self._put(entries[0]['chain'], state)
+
+        for position in range(start + 1, len(entries)):
+            data, _ = storage.download(container_name, entries[position]['blob'])
+            state = apply_delta(state, json.loads(data))
+            if position % CHECKPOINT_EVERY == 0 or position == len(entries) - 1:
+                self._put(entries[position]['chain'], state)
+        return state
+
+    def state_as_of(self, storage, container_name, manifest, week):
+        # None when the history starts after `week`
+        if manifest['base']['week'] > week:
+            return None
+        count = sum(1 for d in manifest['deltas'] if d['week'] <= week)
+        return self.state(storage, container_name, manifest, count)
+
+
+reader = SnapshotReader()
+
+
+def read_snapshot_manifest(storage, container_name, season):
+    data, _ = storage.download(container_name, snapshot_manifest_blob(season))
+    return json.loads(data)
+
+
+def snapshots_exist(storage, container_name, season):
+    try:
+        storage.get_properties(container_name, snapshot_manifest_blob(season))
+        return True
+    except NotFoundError:
+        return False
+
+
+def record_snapshot(storage, container_name, season, records):
+    # Returns the weeks for which a base or delta was written
+    try:
+        manifest = read_snapshot_manifest(storage, container_name, season)
+    except NotFoundError:
+        manifest = None
+
+    written = []
+    for week, rows in sorted(split_weeks(records).items()):
+        state = to_state(rows)
+        if manifest is None:
+            body = json.dumps(list(state.values()))
+            blob_name = f'{snapshot_prefix(season)}/base.json'
+            storage.upload(container_name, blob_name, body, overwrite=True)
+            manifest = {
+                'season': season, 'key': SNAPSHOT_KEY,
+                'base': {'week': week, 'blob': blob_name, 'rows': len(state), 'chain': sha1(body)},
+                'deltas': []
+            }
+            reader._put(manifest['base']['chain'], state)
+            written.append(week)
+            continue
+
+        latest = (manifest['deltas'] or [manifest['base']])[-1]
+        if week < latest['week']:
+            continue  # History is append-only; earlier weeks are never rewritten
+        delta = diff_states(reader.state(storage, container_name, manifest, len(manifest['deltas'])), state)
+        if not (delta['adds'] or delta['removals'] or delta['changes']):
+            continue
+        body = json.dumps(delta)
+        blob_name = f'{snapshot_prefix(season)}/delta-{len(manifest["deltas"]) + 1:04d}-week={week}.json'
+        storage.upload(container_name, blob_name, body, overwrite=True)
+        manifest['deltas'].append({
+            'week': week, 'blob': blob_name, 'adds': len(delta['adds']), 'removals': len(delta['removals']),
+            'changes': len(delta['changes']), 'chain': sha1(latest['chain'] + sha1(body))
+        })
+        written.append(week)
+
+    if written:
+        # The manifest goes last, so readers only ever see complete deltas
+        storage.upload(container_name, snapshot_manifest_blob(season), json.dumps(manifest), overwrite=True)
+    return written
+
+
+def present(state, week):
+    # Rows carry the week of the snapshot they were reconstructed for
+    return [dict(row, week=week) if 'week' in row else row for row in state.values()]
@@ -0,0 +1,340 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
+
+# Shared storage access for app.py and the blob2sql scripts.
+# get_storage() returns one long-lived backend per process: Azure Blob Storage with a
+# pooled BlobServiceClient, or a local directory that mirrors the container/blob layout
+# (STORAGE_BACKEND=local, LOCAL_STORAGE_DIR) for running the pipeline without Azure.
+# get_async_storage() is the read side of the same backends for app_async.py.
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class NotFoundError(Exception):
+    pass
+
+
+class BlobProperties:
+    def __init__(self, etag, size, last_modified=None, metadata=None):
+        self.etag = etag
+        self.size = size
+        self.last_modified = last_modified
+        self.metadata = metadata or {}
+
+
+def new_block_id():
+    return base64.b64encode(uuid.uuid4().hex.encode('utf-8')).decode('utf-8')
+
+
+class AzureBlobStorage:
+    def __init__(self, connection_string, max_concurrency=4, chunk_size=DEFAULT_CHUNK_SIZE):
+        from azure.storage.blob import BlobServiceClient
+        import azure.core.exceptions
+
+        self._not_found = azure.core.exceptions.ResourceNotFoundError
+        self._exists = azure.core.exceptions.ResourceExistsError
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        # One client per process keeps the HTTP connection pool and TLS sessions warm
+        self.client = BlobServiceClient.from_connection_string(
+            connection_string,
+            max_single_get_size=chunk_size,
+            max_chunk_get_size=chunk_size,
+            max_block_size=chunk_size,
+            max_single_put_size=chunk_size
+        )
+        self._containers = set()
+        self._lock = threading.Lock()
+
+    def _blob(self, container_name, blob_name):
+        return self.client.get_blob_client(container_name, blob_name)
+
+    def ensure_container(self, container_name):
+        if container_name in self._containers:
+            return
+        try:
+            self.client.get_container_client(container_name).create_container()
+        except self._exists:
+            pass  # Container already exists
+        with self._lock:
+            self._containers.add(container_name)
+
+    def get_properties(self, container_name, blob_name):
+        try:
+            props = self._blob(container_name, blob_name).get_blob_properties()
+        except self._not_found as e:
+            raise NotFoundError(f"Blob {blob_name} not found in container {container_name}") from e
+        return BlobProperties(props.etag, props.size, props.last_modified, props.metadata)
+
+    def download(self, container_name, blob_name, offset=None, length=None):
+        try:
+            downloader = self._blob(container_name, blob_name).download_blob(
+                offset=offset, length=length, max_concurrency=self.max_concurrency
+            )
+            data = downloader.readall()
+        except self._not_found as e:
+            raise NotFoundError(f"Blob {blob_name} not found in container {container_name}") from e
+        props = downloader.properties
+        return data, BlobProperties(props.etag, props.size, props.last_modified, props.metadata)
+
+    def iter_chunks(self, container_name, blob_name, chunk_size=None):
+        try:
+            downloader = self._blob(container_name, blob_name).download_blob(max_concurrency=self.max_concurrency)
+        except self._not_found as e:
+            raise NotFoundError(f"Blob {blob_name} not found in container {container_name}") from e
+        if not chunk_size:
+            yield from downloader.chunks()
+            return
+        # Re-slice the service chunks into fixed-size pieces
+        buffer = bytearray()
+        for chunk in downloader.chunks():
+            buffer += chunk
+            while len(buffer) >= chunk_size:
+                yield bytes(buffer[:chunk_size])
+                del buffer[:chunk_size]
+        if buffer:
+            yield bytes(buffer)
+
+    def upload(self, container_name, blob_name, data, overwrite=True, metadata=None):
+        self.ensure_container(container_name)
+        # Payloads above the block size are split into blocks and uploaded in parallel
+        result = self._blob(container_name, blob_name).upload_blob(
+            data, overwrite=overwrite, metadata=metadata, max_concurrency=self.max_concurrency
+        )
+        return result.get('etag')
+
+    def stage_block(self, container_name, blob_name, block_id, data):
+        self._blob(container_name, blob_name).stage_block(block_id, data)
+
+    def commit_blocks(self, container_name, blob_name, block_ids, metadata=None):
+        from azure.storage.blob import BlobBlock
+
+        self.ensure_container(container_name)
+        result = self._blob(container_name, blob_name).commit_block_list(
+            [BlobBlock(block_id=b) for b in block_ids], metadata=metadata
+        )
+        return result.get('etag')
+
+    def set_metadata(self, container_name, blob_name, metadata):
+        self._blob(container_name, blob_name).set_blob_metadata(metadata)
+
+    def discard_blocks(self, container_name, blob_name):
+        pass  # Uncommitted blocks are garbage collected by the service
+
+    def delete(self, container_name, blob_name):
+        try:
+            self._blob(container_name, blob_name).delete_blob()
+        except self._not_found:
+            pass
+
+
+class LocalStorage:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _path(self, container_name, blob_name):
+        return os.path.join(self.root, container_name, *blob_name.split('/'))
+
+    def _meta_path(self, container_name, blob_name):
+        return os.path.join(self.root, '.meta', container_name, *blob_name.split('/')) + '.json'
+
+    def _blocks_dir(self, container_name, blob_name):
+        return os.path.join(self.root, '.blocks', container_name, *blob_name.split('/'))
+
+    def _etag(self, path):
+        stat = os.stat(path)
+        return '"' + hashlib.md5(f'{stat.st_mtime_ns}-{stat.st_size}'.encode('utf-8')).hexdigest() + '"'
+
+    def ensure_container(self, container_name):
+        os.makedirs(os.path.join(self.root, container_name), exist_ok=True)
+
+    def get_properties(self, container_name, blob_name):
+        path = self._path(container_name, blob_name)
+        if not os.path.isfile(path):
+            raise NotFoundError(f"Blob {blob_name} not found in container {container_name}")
+        metadata = {}
+        meta_path = self._meta_path(container_name, blob_name)
+        if os.path.isfile(meta_path):
+            with open(meta_path) as f:
+                metadata = json.load(f)
+        last_modified = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+        return BlobProperties(self._etag(path), os.path.getsize(path), last_modified, metadata)
+
+    def download(self, container_name, blob_name, offset=None, length=None):
+        props = self.get_properties(container_name, blob_name)
+        with open(self._path(container_name, blob_name), 'rb') as f:
+            if offset:
+                f.seek(offset)
+            data = f.read() if length is None else f.read(length)
+        return data, props
+
+    def iter_chunks(self, container_name, blob_name, chunk_size=None):
+        self.get_properties(container_name, blob_name)
+        with open(self._path(container_name, blob_name), 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size or DEFAULT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _write_metadata(self, container_name, blob_name, metadata):
+        meta_path = self._meta_path(container_name, blob_name)
+        if metadata:
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            with open(meta_path, 'w') as f:
+                json.dump(metadata, f)
+        elif os.path.isfile(meta_path):
+            os.remove(meta_path)
+
+    def upload(self, container_name, blob_name, data, overwrite=True, metadata=None):
+        path = self._path(container_name, blob_name)
+        if not overwrite and os.path.exists(path):
+            raise FileExistsError(f"Blob {blob_name} already exists in container {container_name}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        # Write to a temporary file and rename so readers never see a partial blob
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            if hasattr(data, 'read'):
+                shutil.copyfileobj(data, f)
+            else:
+                f.write(data)
+        os.replace(tmp_path, path)
+        self._write_metadata(container_name, blob_name, metadata)
+        return self._etag(path)
+
+    def stage_block(self, container_name, blob_name, block_id, data):
+        blocks_dir = self._blocks_dir(container_name, blob_name)
+        os.makedirs(blocks_dir, exist_ok=True)
+        with open(os.path.join(blocks_dir, hashlib.md5(block_id.encode('utf-8')).hexdigest()), 'wb') as f:
+            f.write(data)
+
+    def commit_blocks(self, container_name, blob_name, block_ids, metadata=None):
+        path = self._path(container_name, blob_name)
+        blocks_dir = self._blocks_dir(container_name, blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as out:
+            for block_id in block_ids:
+                with open(os.path.join(blocks_dir, hashlib.md5(block_id.encode('utf-8')).hexdigest()), 'rb') as f:
+                    shutil.copyfileobj(f, out)
+        os.replace(tmp_path, path)
+        shutil.rmtree(blocks_dir, ignore_errors=True)
+        self._write_metadata(container_name, blob_name, metadata)
+        return self._etag(path)
+
+    def set_metadata(self, container_name, blob_name, metadata):
+        self.get_properties(container_name, blob_name)
+        self._write_metadata(container_name, blob_name, metadata)
+
+    def discard_blocks(self, container_name, blob_name):
+        shutil.rmtree(self._blocks_dir(container_name, blob_name), ignore_errors=True)
+
+    def delete(self, container_name, blob_name):
+        path = self._path(container_name, blob_name)
+        if os.path.isfile(path):
+            os.remove(path)
+        self._write_metadata(container_name, blob_name, None)
+
+
+class AsyncAzureBlobStorage:
+    # Reads on the asyncio client (azure.storage.blob.aio, needs aiohttp); writes stay on AzureBlobStorage
+    def __init__(self, connection_string, max_concurrency=4, chunk_size=DEFAULT_CHUNK_SIZE):
+        from azure.storage.blob.aio import BlobServiceClient
+        import azure.core.exceptions
+
+        self._not_found = azure.core.exceptions.ResourceNotFoundError
+        self.max_concurrency = max_concurrency
+        self.client = BlobServiceClient.from_connection_string(
+            connection_string,
+            max_single_get_size=chunk_size,
+            max_chunk_get_size=chunk_size
+        )
+
+    def _blob(self, container_name, blob_name):
+        return self.client.get_blob_client(container_name, blob_name)
+
+    async def get_properties(self, container_name, blob_name):
+        try:
+            props = await self._blob(container_name, blob_name).get_blob_properties()
+        except self._not_found as e:
+            raise NotFoundError(f"Blob {blob_name} not found in container {container_name}") from e
+        return BlobProperties(props.etag, props.size, props.last_modified, props.metadata)
+
+    async def download(self, container_name, blob_name, offset=None, length=None):
+        try:
+            downloader = await self._blob(container_name, blob_name).download_blob(
+                offset=offset, length=length, max_concurrency=self.max_concurrency
+            )
+            data = await downloader.readall()
+        except self._not_found as e:
+            raise NotFoundError(f"Blob {blob_name} not found in container {container_name}") from e
+        props = downloader.properties
+        return data, BlobProperties(props.etag, props.size, props.last_modified, props.metadata)
+
+    async def close(self):
+        await self.client.close()
+
+
+class AsyncLocalStorage:
+    # Local stand-in: LocalStorage reads on worker threads so file I/O never blocks the event loop
+    def __init__(self, storage):
+        self.storage = storage
+
+    async def get_properties(self, container_name, blob_name):
+        return await asyncio.to_thread(self.storage.get_properties, container_name, blob_name)
+
+    async def download(self, container_name, blob_name, offset=None, length=None):
+        return await asyncio.to_thread(self.storage.download, container_name, blob_name, offset, length)
+
+    async def close(self):
+        pass
+
+
+_storage = None
+_storage_lock = threading.Lock()
+_async_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if os.getenv('STORAGE_BACKEND', 'azure') == 'local':
+                    _storage = LocalStorage(os.getenv('LOCAL_STORAGE_DIR', 'local-storage'))
+                else:
+                    _storage = AzureBlobStorage(
+                        os.getenv('AZURE_STORAGE_CONNECTION_STRING'),
+                        max_concurrency=int(os.getenv('STORAGE_MAX_CONCURRENCY', 4))
+                    )
+    return _storage
+
+
+def get_async_storage():
+    # Called from the event loop thread only, so no lock is needed
+    global _async_storage
+    if _async_storage is None:
+        if os.getenv('STORAGE_BACKEND', 'azure') == 'local':
+            _async_storage = AsyncLocalStorage(get_storage())
+        else:
+            _async_storage = AsyncAzureBlobStorage(
+                os.getenv('AZURE_STORAGE_CONNECTION_STRING'),
+                max_concurrency=int(os.getenv('STORAGE_MAX_CONCURRENCY', 4))
+            )
+    return _async_storage
+
+
+async def close_async_storage():
+    global _async_storage
+    if _async_storage is not None:
+        await _async_storage.close()
+        _async_storage = None
@@ -0,0 +1,28 @@
+from snapshots import SnapshotReader, read_snapshot_manifest, record_snapshot, split_weeks
+from storage import LocalStorage
+
+
+def test_season_file_with_null_ids_is_not_split_by_week():
+    records = [
+        {'gsis_id': 'A', 'week': 18},
+        {'gsis_id': 'B', 'week': 5},
+        {'gsis_id': None, 'week': 12},
+        {'gsis_id': None, 'week': 18},
+    ]
+    assert list(split_weeks(records)) == [18]
+
+
+def test_season_file_with_null_ids_keeps_every_player(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    storage.ensure_container('rosters')
+    records = [
+        {'gsis_id': 'A', 'week': 18, 'team': 'TEN'},
+        {'gsis_id': 'B', 'week': 5, 'team': 'TEN'},
+        {'gsis_id': None, 'week': 12, 'team': 'TEN'},
+        {'gsis_id': None, 'week': 18, 'team': 'TEN'},
+    ]
+    assert record_snapshot(storage, 'rosters', 2024, records) == [18]
+
+    manifest = read_snapshot_manifest(storage, 'rosters', 2024)
+    state = SnapshotReader().state_as_of(storage, 'rosters', manifest, 18)
+    assert sorted(state) == ['A', 'B']